@@ -14,25 +14,79 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import copy
+import multiprocessing
 import operator
+import os
+from concurrent.futures import ProcessPoolExecutor
+from math import inf
 from nltk.sem.evaluate import Error
+import numpy as np
 from tqdm import tqdm
 from huiAudioCorpus.model.SentenceAlignment import SentenceAlignment
 from typing import List
 from huiAudioCorpus.model.Sentence import Sentence
 from huiAudioCorpus.transformer.SentenceDistanceTransformer import SentenceDistanceTransformer
-from joblib import Parallel, delayed
+from huiAudioCorpus.calculator.AnchorChainCalculator import AnchorChainCalculator
 
 # range of words to consider when aligning sentences
 word_range = 40
+# range of words to consider around the estimated start of sentences with anchors
+anchor_word_range = 15
+# alignments with a larger distance are above the threshold
+distance_threshold = 0.2
+# maximum number of words in a search range
+max_range_threshold = 2000
+# number of words a candidate span may exceed the sentence to align by
+additional_words_per_span = 10
+alignment_engines = ['exhaustive', 'banded', 'bounded']
+alignment_modes = ['sliding_window', 'anchored']
+# search ranges with fewer candidate ends are not split between the workers
+min_ends_per_task = 50
+# number of sentences which are sent to a worker at once
+sentences_per_task = 16
+
+# state of the worker processes, set once per process by `init_alignment_worker`
+alignment_worker_state = {}
+
+def init_alignment_worker(calculator: 'AlignSentencesIntoTextCalculator', original_text: Sentence):
+    """Store the calculator and the original text in the worker process, so they are only sent once per worker."""
+    alignment_worker_state['calculator'] = calculator
+    alignment_worker_state['original_text'] = original_text
+
+def align_chapter_in_worker(calculator: 'AlignSentencesIntoTextCalculator', chapter_text: Sentence, sentences_to_align: List[Sentence]):
+    """Align the sentences of one chapter to the text region of the chapter in a worker process."""
+    return calculator.calculate_alignments_with_mode(chapter_text, sentences_to_align)
+
+def best_positions_in_worker(searches: List):
+    """Find the best positions for a batch of (sentence_to_align, range_start, range_end) searches in a worker process."""
+    calculator = alignment_worker_state['calculator']
+    original_text = alignment_worker_state['original_text']
+    return [calculator.best_position_in_process(original_text, sentence_to_align, range_start, range_end) for sentence_to_align, range_start, range_end in searches]
 
 class AlignSentencesIntoTextCalculator:
     """
     A class for aligning sentences to text based on distance metrics.
     """
 
-    def __init__(self, sentence_distance_transformer: SentenceDistanceTransformer, sections: List):
+    def __init__(self, sentence_distance_transformer: SentenceDistanceTransformer, sections: List, alignment_engine: str = 'exhaustive',
+                 alignment_mode: str = 'sliding_window', anchor_chain_calculator: AnchorChainCalculator = None, number_of_workers: int = 4):
         self.sentence_distance_transformer = sentence_distance_transformer
+        # the worker pool is created once per original text and receives the text only once per worker
+        self.number_of_workers = min(number_of_workers, os.cpu_count() or 1)
+        self.worker_pool = None
+        self.worker_pool_text = None
+        if alignment_mode not in alignment_modes:
+            raise ValueError(f"Unknown alignment mode '{alignment_mode}', choose one of {alignment_modes}.")
+        # `sliding_window` moves the search range sequentially through the text, `anchored` derives the search ranges from rare n-grams
+        self.alignment_mode = alignment_mode
+        self.anchor_chain_calculator = anchor_chain_calculator if anchor_chain_calculator is not None else AnchorChainCalculator()
+        if alignment_engine not in alignment_engines:
+            raise ValueError(f"Unknown alignment engine '{alignment_engine}', choose one of {alignment_engines}.")
+        # `exhaustive` scores every candidate span separately, `banded` scores all spans of a search range in one batched pass,
+        # `bounded` scores the candidates sequentially and only computes distances that can beat the best candidate so far
+        self.alignment_engine = alignment_engine
+        self.text_index = None
         self.total_allowed_moving_of_search_range = 1 # 1 default for beginning of source text
         # for every non-consecutive section, allow moving of search range once more
         for idx, section in enumerate(sorted(sections)):
@@ -54,11 +108,159 @@ class AlignSentencesIntoTextCalculator:
             alignments (List[SentenceAlignment]): list of SentenceAlignment objects representing the alignments
         """
 
-        alignments = self.calculate_alignments(original_text, sentences_to_align, self.total_allowed_moving_of_search_range)
+        alignments = self.calculate_alignments_with_mode(original_text, sentences_to_align)
         alignments = self.evaluate_if_perfect_start_and_end(alignments, original_text.words_count)
         alignments = self.get_missing_words_between_alignments(alignments, original_text)
         return alignments
 
+    def calculate_by_chapter(self, original_text: Sentence, sentences_to_align: List[Sentence], number_of_chapter_workers: int = None):
+        """
+        Calculate sentence alignments like `calculate`, but align the chapters concurrently.
+        The chapter of a sentence is taken from its id (`<book>_<chapter>_f<index>`), and the rough text region of each chapter is located via anchors.
+
+        Params:
+            original_text (Sentence): original text to which sentences should be aligned
+            sentences_to_align (List[Sentence]): list of sentences to align
+            number_of_chapter_workers (int): number of chapters which are aligned at the same time (defaults to `number_of_workers`)
+
+        Returns:
+            alignments (List[SentenceAlignment]): list of SentenceAlignment objects representing the alignments
+        """
+        chapters = self.group_by_chapter(sentences_to_align)
+        regions = self.locate_chapter_regions(original_text, chapters)
+
+        # the regions are tokenized again, their word indices only match the original text if they have the same number of words
+        chapter_texts = [original_text[region_start:region_end] for region_start, region_end in regions]
+        for chapter_text, (region_start, region_end) in zip(chapter_texts, regions):
+            if chapter_text.words_count != min(region_end, original_text.words_count) - region_start:
+                print(f"Words {region_start}:{region_end} have {chapter_text.words_count} words after tokenizing them again, aligning the complete text instead.")
+                return self.calculate(original_text, sentences_to_align)
+
+        # every chapter is aligned in a single process, so the calculator of the chapters doesn't start workers itself
+        chapter_calculator = copy.copy(self)
+        chapter_calculator.number_of_workers = 1
+        number_of_chapter_workers = number_of_chapter_workers if number_of_chapter_workers is not None else self.number_of_workers
+        with ProcessPoolExecutor(max_workers=number_of_chapter_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = []
+            for chapter_sentences, chapter_text, (region_start, region_end) in zip(chapters, chapter_texts, regions):
+                print(f"Aligning {len(chapter_sentences)} sentences of chapter {self.get_chapter(chapter_sentences[0])} to words {region_start}:{region_end}.")
+                futures.append(executor.submit(align_chapter_in_worker, chapter_calculator, chapter_text, chapter_sentences))
+
+            alignments: List[SentenceAlignment] = []
+            for future, (region_start, _) in zip(futures, regions):
+                for align in future.result():
+                    align.start += region_start
+                    align.end += region_start
+                    align.aligned_text = original_text.span(align.start, align.end)
+                    alignments.append(align)
+
+        alignments = self.evaluate_if_perfect_start_and_end(alignments, original_text.words_count)
+        alignments = self.get_missing_words_between_alignments(alignments, original_text)
+        return alignments
+
+    def get_chapter(self, sentence: Sentence):
+        """Get the chapter from the id of a sentence (`<book>_<chapter>_f<index>`)."""
+        return sentence.id.rsplit('_', 2)[1]
+
+    def group_by_chapter(self, sentences_to_align: List[Sentence]):
+        """Split the sentences into lists of consecutive sentences of the same chapter."""
+        chapters: List[List[Sentence]] = []
+        for sentence in sentences_to_align:
+            if len(chapters) > 0 and self.get_chapter(chapters[-1][-1]) == self.get_chapter(sentence):
+                chapters[-1].append(sentence)
+            else:
+                chapters.append([sentence])
+        return chapters
+
+    def locate_chapter_regions(self, original_text: Sentence, chapters: List[List[Sentence]]):
+        """
+        Locate the rough text region of each chapter via the anchors of its sentences.
+        Chapters without anchors get the region between the regions of the neighbouring chapters.
+
+        Params:
+            original_text (Sentence): original text
+            chapters (List[List[Sentence]]): sentences of each chapter
+
+        Returns:
+            regions (List[Tuple[int, int]]): start and end word index of the region of each chapter
+        """
+        estimated_starts = self.anchor_chain_calculator.calculate(original_text, [sentence for chapter in chapters for sentence in chapter])
+        regions: List = []
+        sentence_index = 0
+        for chapter in chapters:
+            words_before = 0
+            region_start = None
+            region_end = None
+            chapter_words = sum(sentence.words_count for sentence in chapter)
+            for sentence in chapter:
+                estimated_start = estimated_starts[sentence_index]
+                if estimated_start is not None:
+                    # extrapolate from the anchored sentence to the beginning and the end of the chapter
+                    start = estimated_start - words_before - word_range
+                    end = estimated_start + chapter_words - words_before + word_range
+                    region_start = start if region_start is None else min(region_start, start)
+                    region_end = end if region_end is None else max(region_end, end)
+                words_before += sentence.words_count
+                sentence_index += 1
+            regions.append(None if region_start is None else (max(0, region_start), min(region_end, original_text.words_count)))
+
+        for idx, region in enumerate(regions):
+            if region is None:
+                previous_regions = [region for region in regions[:idx] if region is not None]
+                next_regions = [region for region in regions[idx + 1:] if region is not None]
+                region_start = previous_regions[-1][1] if previous_regions else 0
+                region_end = next_regions[0][0] if next_regions else original_text.words_count
+                region_end = max(region_end, region_start + sum(sentence.words_count for sentence in chapters[idx]) + word_range)
+                regions[idx] = (region_start, min(region_end, original_text.words_count))
+        return regions
+
+    def calculate_alignments_with_mode(self, original_text: Sentence, sentences_to_align: List[Sentence]):
+        """
+        Calculate sentence alignments with the configured alignment mode.
+
+        Params:
+            original_text (Sentence): original text to which sentences should be aligned
+            sentences_to_align (List[Sentence]): list of sentences to align
+
+        Returns:
+            alignments (List[SentenceAlignment]): list of SentenceAlignment objects representing the alignments
+        """
+        if self.alignment_engine == 'banded':
+            self.text_index = self.build_text_index(original_text)
+        self.open_worker_pool(original_text)
+        if self.alignment_mode == 'anchored':
+            return self.calculate_alignments_anchored(original_text, sentences_to_align)
+        return self.calculate_alignments(original_text, sentences_to_align, self.total_allowed_moving_of_search_range)
+
+    def open_worker_pool(self, original_text: Sentence):
+        """
+        Start the worker processes for the given original text, unless they are already running for it.
+        No workers are started if `number_of_workers` is 1.
+        """
+        if self.worker_pool is not None and self.worker_pool_text is original_text:
+            return
+        self.close_worker_pool()
+        if self.number_of_workers <= 1:
+            return
+        # spawned instead of forked, because the step may run in a thread of the workflow scheduler next to other threads holding locks
+        self.worker_pool = ProcessPoolExecutor(max_workers=self.number_of_workers, mp_context=multiprocessing.get_context('spawn'),
+                                               initializer=init_alignment_worker, initargs=(self, original_text))
+        self.worker_pool_text = original_text
+
+    def close_worker_pool(self):
+        """Shut down the worker processes."""
+        if self.worker_pool is not None:
+            self.worker_pool.shutdown()
+        self.worker_pool = None
+        self.worker_pool_text = None
+
+    def __getstate__(self):
+        # the worker pool can't be sent to the workers
+        state = self.__dict__.copy()
+        state['worker_pool'] = None
+        state['worker_pool_text'] = None
+        return state
+
 
     def calculate_alignments(self, original_text: Sentence, sentences_to_align: List[Sentence], remaining_allowed_moving_of_search_range: int):
         """
@@ -72,107 +274,239 @@ class AlignSentencesIntoTextCalculator:
         Returns:
             alignments (List[SentenceAlignment]): list of SentenceAlignment objects representing the alignments
         """        
-        with Parallel(n_jobs=4, batch_size="auto") as parallel:
-            alignments:List[SentenceAlignment] = []
-            start = 0
-            additional_range = 0
-            distance_threshold = 0.2
-            max_range_threshold = 2000
-            first_alignment_found = False
-            max_consecutive_unaligned_sents_threshold = 5
-            consecutive_unaligned_sents = 0
-            for idx, asr_sent in enumerate(tqdm(sentences_to_align)):
-                # Find the best position for the current text within the given range
-                range_start = max(0, start - word_range - additional_range)
-                range_end = min(range_start + 2 * (word_range + additional_range) + asr_sent.words_count, original_text.words_count + 1)
-
-                # if no alignment below distance threshold is found, move start of search range or raise error
-                if range_end - range_start > max_range_threshold:
-                    if not first_alignment_found:
-                        start = max_range_threshold
-                        range_start += max_range_threshold
-                        additional_range = 0
-                    else:
-                        raise Exception(f'more than {max_range_threshold} Words in search text')
+        alignments:List[SentenceAlignment] = []
+        start = 0
+        additional_range = 0
+        first_alignment_found = False
+        max_consecutive_unaligned_sents_threshold = 5
+        consecutive_unaligned_sents = 0
+        for idx, asr_sent in enumerate(tqdm(sentences_to_align)):
+            # Find the best position for the current text within the given range
+            range_start = max(0, start - word_range - additional_range)
+            range_end = min(range_start + 2 * (word_range + additional_range) + asr_sent.words_count, original_text.words_count + 1)
+
+            # if no alignment below distance threshold is found, move start of search range or raise error
+            if range_end - range_start > max_range_threshold:
+                if not first_alignment_found:
+                    start = max_range_threshold
+                    range_start += max_range_threshold
+                    additional_range = 0
+                else:
+                    raise Exception(f'more than {max_range_threshold} Words in search text')
                     
-                # update start of search range if too many consecutive sentences are above alignment threshold
-                if consecutive_unaligned_sents >= max_consecutive_unaligned_sents_threshold:
-                    remaining_allowed_moving_of_search_range -= 1
-                    if remaining_allowed_moving_of_search_range < 0:
-                        raise Exception(f"Too many attempts of moving the search range due to consecutive unaligned sentences. \
-                                        Moving the search range is only allowed {self.total_allowed_moving_of_search_range} times across the complete source text.")
-                    start = end
-                    range_start = start
-                    range_end = max(range_start + word_range, range_end) # to avoid search range <= 0
+            # update start of search range if too many consecutive sentences are above alignment threshold
+            if consecutive_unaligned_sents >= max_consecutive_unaligned_sents_threshold:
+                remaining_allowed_moving_of_search_range -= 1
+                if remaining_allowed_moving_of_search_range < 0:
+                    raise Exception(f"Too many attempts of moving the search range due to consecutive unaligned sentences. \
+                                    Moving the search range is only allowed {self.total_allowed_moving_of_search_range} times across the complete source text.")
+                start = end
+                range_start = start
+                range_end = max(range_start + word_range, range_end) # to avoid search range <= 0
                     
-                    at_least_one_below_alignment_threshold = False
-                    # while none of sentences_to_align[-max_consecutive_unaligned_sents_threshold:] align, move search range
-                    # until at least one of the last sentences aligns below the threshold
-                    print("Too many consecutive sentences above alignment threshold.\nMoving search range to align most recent sentences.")
-                    while not at_least_one_below_alignment_threshold:
-                        for recent_asr_sent in sentences_to_align[idx-max_consecutive_unaligned_sents_threshold:idx]:
-                            (new_start, end), distance = self.best_position(parallel, 
-                                                                            original_text=original_text[range_start:range_end], 
-                                                                            sentence_to_align=recent_asr_sent, 
-                                                                            range_start=0, 
-                                                                            range_end=range_end - range_start)
-                            new_start += range_start
-                            end += range_start
-                            align = SentenceAlignment(recent_asr_sent, original_text[new_start: end], new_start, end, distance)       
-
-                            if distance <= distance_threshold:
-                                at_least_one_below_alignment_threshold = True
-                                first_alignment_found = True
-                                start = end
-                                additional_range = 0
-                                consecutive_unaligned_sents = 0
-                                break
-                            additional_range += 30 + recent_asr_sent.words_count
-                        if not at_least_one_below_alignment_threshold:
-                            range_start += additional_range
-                            range_end = min(range_start + max_range_threshold, range_start + 2 * (word_range + additional_range) + asr_sent.words_count, original_text.words_count + 1)
-
-
-                (new_start, end), distance = self.best_position(parallel, 
-                                                                original_text=original_text[range_start:range_end], 
-                                                                sentence_to_align=asr_sent, 
-                                                                range_start=0, 
-                                                                range_end=range_end - range_start)
-                new_start += range_start
-                end += range_start
-
-                align = SentenceAlignment(asr_sent, original_text[new_start: end], new_start, end, distance)
-
-                if distance > distance_threshold:
-                    print('*****************')
-                    print(f'Above distance threshold ({distance_threshold}): {asr_sent.id} {distance:.3f}')
-                    print('*****************')
-                    print(f"ASR transcript:\n{asr_sent.sentence}")
-                    print('___________________')
-                    print(f"Best alignment in source text:\n{align.aligned_text.sentence}")                    
-                    print('___________________')
-                    print(f"Original text search range:\n{original_text[range_start:range_end].sentence}")
-                    print('########################')
-
-                    align.is_above_threshold = True
-                    additional_range += 30 + asr_sent.words_count
-                    consecutive_unaligned_sents += 1
-                else: 
-                    first_alignment_found = True
-                    start = end
-                    additional_range = 0
-                    consecutive_unaligned_sents = 0
+                at_least_one_below_alignment_threshold = False
+                # while none of sentences_to_align[-max_consecutive_unaligned_sents_threshold:] align, move search range
+                # until at least one of the last sentences aligns below the threshold
+                print("Too many consecutive sentences above alignment threshold.\nMoving search range to align most recent sentences.")
+                while not at_least_one_below_alignment_threshold:
+                    for recent_asr_sent in sentences_to_align[idx-max_consecutive_unaligned_sents_threshold:idx]:
+                        (new_start, end), distance = self.best_position(
+                                                                        original_text=original_text, 
+                                                                        sentence_to_align=recent_asr_sent, 
+                                                                        range_start=range_start, 
+                                                                        range_end=range_end)
+                        align = SentenceAlignment(recent_asr_sent, original_text.span(new_start, end), new_start, end, distance)       
+
+                        if distance <= distance_threshold:
+                            at_least_one_below_alignment_threshold = True
+                            first_alignment_found = True
+                            start = end
+                            additional_range = 0
+                            consecutive_unaligned_sents = 0
+                            break
+                        additional_range += 30 + recent_asr_sent.words_count
+                    if not at_least_one_below_alignment_threshold:
+                        range_start += additional_range
+                        range_end = min(range_start + max_range_threshold, range_start + 2 * (word_range + additional_range) + asr_sent.words_count, original_text.words_count + 1)
+
+
+            (new_start, end), distance = self.best_position(
+                                                            original_text=original_text, 
+                                                            sentence_to_align=asr_sent, 
+                                                            range_start=range_start, 
+                                                            range_end=range_end)
+
+            align = SentenceAlignment(asr_sent, original_text.span(new_start, end), new_start, end, distance)
+
+            if distance > distance_threshold:
+                print('*****************')
+                print(f'Above distance threshold ({distance_threshold}): {asr_sent.id} {distance:.3f}')
+                print('*****************')
+                print(f"ASR transcript:\n{asr_sent.sentence}")
+                print('___________________')
+                print(f"Best alignment in source text:\n{align.aligned_text.sentence}")                    
+                print('___________________')
+                print(f"Original text search range:\n{original_text.span(range_start, range_end).sentence}")
+                print('########################')
+
+                align.is_above_threshold = True
+                additional_range += 30 + asr_sent.words_count
+                consecutive_unaligned_sents += 1
+            else: 
+                first_alignment_found = True
+                start = end
+                additional_range = 0
+                consecutive_unaligned_sents = 0
+
+            alignments.append(align)
+        return alignments
+
 
-                alignments.append(align)
-            return alignments
+    def calculate_alignments_anchored(self, original_text: Sentence, sentences_to_align: List[Sentence]):
+        """
+        Calculate sentence alignments based on distance metrics, with search ranges derived from anchors.
+        Sentences with anchors are searched around their estimated start, sentences without anchors in the gap between
+        the previous alignment and the next anchored sentence.
+
+        Params:
+            original_text (Sentence): original text to which sentences should be aligned
+            sentences_to_align (List[Sentence]): list of sentences to align
+
+        Returns:
+            alignments (List[SentenceAlignment]): list of SentenceAlignment objects representing the alignments
+        """
+        estimated_starts = self.anchor_chain_calculator.calculate(original_text, sentences_to_align)
+        print(f"Found anchors for {len([start for start in estimated_starts if start is not None])} of {len(sentences_to_align)} sentences.")
+
+        # estimated start of the next anchored sentence for every sentence
+        next_estimated_starts: List = [None] * len(sentences_to_align)
+        next_estimated_start = None
+        for idx in reversed(range(len(sentences_to_align))):
+            next_estimated_starts[idx] = next_estimated_start
+            if estimated_starts[idx] is not None:
+                next_estimated_start = estimated_starts[idx]
+
+        # the search ranges of anchored sentences are known in advance, so they are searched in batches
+        anchored_searches = {}
+        for idx, asr_sent in enumerate(sentences_to_align):
+            estimated_start = estimated_starts[idx]
+            if estimated_start is not None:
+                range_start = max(0, estimated_start - anchor_word_range)
+                range_end = estimated_start + asr_sent.words_count + anchor_word_range
+                anchored_searches[idx] = (asr_sent, *self.limit_anchored_search_range(original_text, asr_sent, range_start, range_end))
+        anchored_positions = dict(zip(anchored_searches.keys(), self.best_positions(original_text, list(anchored_searches.values()))))
+
+        alignments: List[SentenceAlignment] = []
+        previous_end = 0
+        for idx, asr_sent in enumerate(tqdm(sentences_to_align)):
+            if idx in anchored_positions:
+                (new_start, end), distance = anchored_positions[idx]
+            else:
+                range_start = max(0, previous_end - anchor_word_range)
+                next_estimated_start = next_estimated_starts[idx]
+                if next_estimated_start is not None and range_start < next_estimated_start <= range_start + max_range_threshold:
+                    range_end = next_estimated_start + anchor_word_range
+                else:
+                    range_end = range_start + 2 * word_range + asr_sent.words_count
+                range_start, range_end = self.limit_anchored_search_range(original_text, asr_sent, range_start, range_end)
+                (new_start, end), distance = self.best_position(original_text=original_text,
+                                                                sentence_to_align=asr_sent,
+                                                                range_start=range_start,
+                                                                range_end=range_end)
+            align = SentenceAlignment(asr_sent, original_text.span(new_start, end), new_start, end, distance)
+
+            if distance > distance_threshold:
+                print(f'Above distance threshold ({distance_threshold}): {asr_sent.id} {distance:.3f}')
+                align.is_above_threshold = True
+            else:
+                previous_end = end
+
+            alignments.append(align)
+        return alignments
+
+    def limit_anchored_search_range(self, original_text: Sentence, sentence_to_align: Sentence, range_start: int, range_end: int):
+        """Limit a search range to the original text, keeping at least one candidate at the end of the text."""
+        range_start = min(range_start, max(0, original_text.words_count - sentence_to_align.words_count - anchor_word_range))
+        range_end = min(max(range_end, range_start + sentence_to_align.words_count + anchor_word_range), original_text.words_count + 1)
+        return range_start, range_end
 
 
-    def best_position(self, parallel: Parallel, original_text: Sentence, sentence_to_align: Sentence, range_start: int, range_end: int):
+    def best_positions(self, original_text: Sentence, searches: List, searches_per_task: int = sentences_per_task):
         """
-        Find the best position for aligning a sentence within a given range.
+        Find the best positions for several independent searches, in batches of sentences on the worker pool if it is running.
+
+        Params:
+            original_text (Sentence): complete original text
+            searches (List[Tuple[Sentence, int, int]]): sentence to align, range start and range end of each search
+            searches_per_task (int): number of searches which are sent to a worker at once
+
+        Returns:
+            best_positions (List[Tuple[Tuple[int, int], float]]): best start and end positions and distance for every search
+        """
+        if self.worker_pool is None:
+            return [self.best_position_in_process(original_text, sentence_to_align, range_start, range_end) for sentence_to_align, range_start, range_end in searches]
+        batches = [searches[idx:idx + searches_per_task] for idx in range(0, len(searches), searches_per_task)]
+        return [position for batch in self.worker_pool.map(best_positions_in_worker, batches) for position in batch]
+
+    def best_position(self, original_text: Sentence, sentence_to_align: Sentence, range_start: int, range_end: int):
+        """
+        Find the best position for aligning a sentence within a given range of the original text.
+        If the worker pool is running, large search ranges are split into parts with consecutive candidate ends which are searched by different workers.
+        Each candidate is contained in one of the parts, and the results are combined with the same tie-breaking as `min` over all candidates.
+
+        Params:
+            original_text (Sentence): complete original text
+            sentence_to_align (Sentence): the sentence to align
+            range_start (int): start index of the search range in the original text
+            range_end (int): end index of the search range in the original text
+
+        Returns:
+            best_position (Tuple[Tuple[int, int], float]): tuple containing the best start and end positions (relative to the complete original text) and the distance
+        """
+        number_of_tasks = min(self.number_of_workers, (range_end - range_start) // min_ends_per_task)
+        if self.worker_pool is None or number_of_tasks <= 1:
+            return self.best_position_in_process(original_text, sentence_to_align, range_start, range_end)
+
+        max_span_words = sentence_to_align.words_count + additional_words_per_span
+        task_ends = np.array_split(np.arange(range_start, range_end), number_of_tasks)
+        # candidates of a part end in [ends[0], ends[-1]] and start at the earliest `max_span_words` before its first end
+        searches = [(sentence_to_align, max(range_start, int(ends[0]) - max_span_words), int(ends[-1]) + 1) for ends in task_ends]
+        positions = self.best_positions(original_text, searches, searches_per_task=1)
+        best_position = min(positions, key=lambda position: (position[1], position[0][1], position[0][0]))
+        return best_position
+
+    def best_position_in_process(self, original_text: Sentence, sentence_to_align: Sentence, range_start: int, range_end: int):
+        """
+        Find the best position for aligning a sentence within a given range of the original text, using the configured alignment engine in the current process.
+
+        Params:
+            original_text (Sentence): complete original text
+            sentence_to_align (Sentence): the sentence to align
+            range_start (int): start index of the search range in the original text
+            range_end (int): end index of the search range in the original text
+
+        Returns:
+            best_position (Tuple[Tuple[int, int], float]): tuple containing the best start and end positions (relative to the complete original text) and the distance
+        """
+        # the search range may run past the end of the text, candidates end at the latest after the last word
+        range_end = min(range_end, original_text.words_count + 1)
+        if self.alignment_engine == 'banded':
+            return self.best_position_banded(original_text, sentence_to_align, range_start, range_end)
+        if self.alignment_engine == 'bounded':
+            return self.best_position_bounded(original_text, sentence_to_align, range_start, range_end)
+
+        # the candidates are scored on a separately tokenized search range
+        (start, end), distance = self.best_position_exhaustive(original_text=original_text[range_start:range_end],
+                                                               sentence_to_align=sentence_to_align,
+                                                               range_start=0,
+                                                               range_end=range_end - range_start)
+        return [(start + range_start, end + range_start), distance]
+
+    def best_position_exhaustive(self, original_text: Sentence, sentence_to_align: Sentence, range_start: int, range_end: int):
+        """
+        Find the best position for aligning a sentence within a given range by scoring every candidate span separately.
 
         Params:
-            parallel (Parallel): parallel processing object
             original_text (Sentence): original text
             sentence_to_align (Sentence): the sentence to align
             range_start (int): start index of the range
@@ -184,18 +518,132 @@ class AlignSentencesIntoTextCalculator:
         start_ends = []
         # Generate possible start and end positions within the given range
         for end in range(range_start, range_end):
-            for start in range(max(range_start, end - sentence_to_align.words_count - 10), end):
+            for start in range(max(range_start, end - sentence_to_align.words_count - additional_words_per_span), end):
                 start_ends.append((start, end))
 
-        # Use parallel processing to find positions and distances
-        positions = parallel(delayed(self.position_one_sentence)(original_text, sentence_to_align, start, end) for start, end in start_ends)
-        # positions = [self.position_one_sentence(original_text, sentence_to_align, start, end) for start, end in start_ends]
+        # Find positions and distances (the search range is already split between the workers)
+        positions = [self.position_one_sentence(original_text, sentence_to_align, start, end) for start, end in start_ends]
         
         # Find the best position based on the minimum distance
         best_position = min(positions, key=operator.itemgetter(1)) # type: ignore
         return best_position
 
 
+    def best_position_bounded(self, original_text: Sentence, sentence_to_align: Sentence, range_start: int, range_end: int):
+        """
+        Find the best position for aligning a sentence within a given range by scoring the candidate spans sequentially,
+        with the distance of the best candidate so far as upper bound for the next ones.
+        Candidates are visited in the same order as in `best_position_exhaustive` and only replace the best one if they are strictly better,
+        so the result is identical to taking the minimum over all candidates.
+
+        Params:
+            original_text (Sentence): complete original text
+            sentence_to_align (Sentence): the sentence to align
+            range_start (int): start index of the search range in the original text
+            range_end (int): end index of the search range in the original text
+
+        Returns:
+            best_position (Tuple[Tuple[int, int], float]): tuple containing the best start and end positions and the distance
+        """
+        best_position = None
+        best_distance = inf
+        for end in range(range_start, range_end):
+            for start in range(max(range_start, end - sentence_to_align.words_count - additional_words_per_span), end):
+                distance = self.sentence_distance_transformer.transform_span_bounded(original_text, start, end, sentence_to_align, best_distance)
+                if distance < best_distance:
+                    best_position = (start, end)
+                    best_distance = distance
+        if best_position is None:
+            raise ValueError(f"No candidate positions in search range {range_start}:{range_end}.")
+        return [best_position, best_distance]
+
+    def build_text_index(self, original_text: Sentence):
+        """
+        Precompute the character arrays of the original text which are needed by the banded alignment engine.
+
+        Params:
+            original_text (Sentence): original text
+
+        Returns:
+            text_index (Tuple[np.ndarray, np.ndarray]): code points of the concatenated words without punctuation and
+                the character offset at which each word starts (with the total number of characters appended)
+        """
+        char_codes = np.frombuffer(original_text.raw_chars.encode('utf-32-le'), dtype=np.uint32)
+        char_offsets = np.asarray(original_text.char_offsets, dtype=np.int64)
+        return char_codes, char_offsets
+
+    def best_position_banded(self, original_text: Sentence, sentence_to_align: Sentence, range_start: int, range_end: int):
+        """
+        Find the best position for aligning a sentence within a given range by scoring all candidate spans in one batched pass.
+        For every candidate start, an edit-distance DP is run over the characters of the original text, so that a single pass yields
+        the distance for every candidate end. All starts are processed simultaneously. The candidates, the distance measure and
+        the tie-breaking are the same as in `best_position_exhaustive`.
+
+        Params:
+            original_text (Sentence): complete original text
+            sentence_to_align (Sentence): the sentence to align
+            range_start (int): start index of the search range in the original text
+            range_end (int): end index of the search range in the original text
+
+        Returns:
+            best_position (Tuple[Tuple[int, int], float]): tuple containing the best start and end positions and the distance
+        """
+        if self.text_index is None:
+            self.text_index = self.build_text_index(original_text)
+        char_codes, char_offsets = self.text_index
+
+        # candidate spans are [start, end) with range_start <= start < end < range_end
+        starts = np.arange(range_start, range_end - 1)
+        if len(starts) == 0:
+            raise ValueError(f"No candidate positions in search range {range_start}:{range_end}.")
+        if sentence_to_align.words_count == 0:
+            return [(range_start, range_start + 1), 1]
+
+        pattern = np.frombuffer(sentence_to_align.raw_chars.encode('utf-32-le'), dtype=np.uint32)
+        pattern_length = len(pattern)
+        max_span_words = sentence_to_align.words_count + additional_words_per_span
+        last_ends = np.minimum(starts + max_span_words, range_end - 1)
+        char_starts = char_offsets[starts]
+        steps = int((char_offsets[last_ends] - char_starts).max())
+
+        # distances[s, i] is the edit distance between pattern[:i] and the original text characters read so far from start s
+        pattern_positions = np.arange(pattern_length + 1)
+        distances = np.tile(pattern_positions, (len(starts), 1)).astype(np.int32)
+        full_pattern_distances = np.empty((steps + 1, len(starts)), dtype=np.int32)
+        full_pattern_distances[0] = pattern_length
+        for step in range(1, steps + 1):
+            # starts whose spans are already complete read a clipped character, their values are never used
+            chars = char_codes[np.minimum(char_starts + step - 1, len(char_codes) - 1)]
+            new_distances = np.empty_like(distances)
+            new_distances[:, 0] = step
+            new_distances[:, 1:] = np.minimum(distances[:, 1:] + 1, distances[:, :-1] + (pattern[None, :] != chars[:, None]))
+            # insertions within the same column: d[i] = min_k(d[k] + i - k)
+            distances = np.minimum.accumulate(new_distances - pattern_positions, axis=1) + pattern_positions
+            full_pattern_distances[step] = distances[:, pattern_length]
+
+        # gather the distance of every candidate span
+        candidate_starts = []
+        candidate_ends = []
+        candidate_distances = []
+        start_indices = np.arange(len(starts))
+        for span_words in range(1, max_span_words + 1):
+            valid = starts + span_words <= last_ends
+            if not valid.any():
+                break
+            ends = starts[valid] + span_words
+            span_chars = char_offsets[ends] - char_starts[valid]
+            diff = full_pattern_distances[span_chars, start_indices[valid]]
+            candidate_starts.append(starts[valid])
+            candidate_ends.append(ends)
+            candidate_distances.append(diff / np.maximum(span_chars, pattern_length))
+        candidate_starts = np.concatenate(candidate_starts)
+        candidate_ends = np.concatenate(candidate_ends)
+        candidate_distances = np.concatenate(candidate_distances)
+
+        # same tie-breaking as `min` over the candidates ordered by end, then start
+        best = np.lexsort((candidate_starts, candidate_ends, candidate_distances))[0]
+        return [(int(candidate_starts[best]), int(candidate_ends[best])), float(candidate_distances[best])]
+
     def position_one_sentence(self, original_text: Sentence , sentence_to_align: Sentence, start: int, end: int):
         """
         Calculate the distance between a part of the original text and the sentence to align.
@@ -209,7 +657,7 @@ class AlignSentencesIntoTextCalculator:
         Returns:
             Tuple[Tuple[int, int], float]: tuple containing the start and end positions and the distance
         """        
-        distance = self.sentence_distance_transformer.transform(original_text[start:end], sentence_to_align)
+        distance = self.sentence_distance_transformer.transform_span(original_text, start, end, sentence_to_align)
         return [(start, end), distance]
 
 
@@ -266,6 +714,6 @@ class AlignSentencesIntoTextCalculator:
             
             # Print missing words between non-perfect alignments
             if not align.right_is_perfect:
-                print(original_text[align.end:alignments[index + 1].start])
+                print(original_text.span(align.end, alignments[index + 1].start).sentence)
 
         return alignments
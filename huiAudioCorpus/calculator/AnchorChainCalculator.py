@@ -0,0 +1,119 @@
+"""
+Copyright 2024 Lyonel Behringer
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from bisect import bisect_left
+from statistics import median
+from typing import Dict, List, Optional, Tuple
+from huiAudioCorpus.model.Sentence import Sentence
+
+class AnchorChainCalculator:
+    """
+    A class for estimating where sentences are located in a text, based on rare word n-grams that occur in both.
+    Params:
+        ngram_size (int): number of consecutive words that form an n-gram
+        max_ngram_occurrences (int): n-grams which occur more often than this in the text are not used as anchors
+    """
+
+    def __init__(self, ngram_size: int = 3, max_ngram_occurrences: int = 1):
+        self.ngram_size = ngram_size
+        self.max_ngram_occurrences = max_ngram_occurrences
+
+    def calculate(self, original_text: Sentence, sentences_to_align: List[Sentence]):
+        """
+        Estimate the start position of each sentence in the original text.
+
+        Params:
+            original_text (Sentence): original text to which sentences should be aligned
+            sentences_to_align (List[Sentence]): list of sentences to align
+
+        Returns:
+            estimated_starts (List[Optional[int]]): estimated start word index in the original text for every sentence,
+                None for sentences without an anchor
+        """
+        index = self.build_index(original_text)
+        anchors = self.find_anchors(index, sentences_to_align)
+        chained_anchors = self.chain(anchors)
+
+        offsets_per_sentence: Dict[int, List[int]] = {}
+        for sentence_index, word_index, text_position in chained_anchors:
+            offsets_per_sentence.setdefault(sentence_index, []).append(text_position - word_index)
+        estimated_starts = [max(0, int(median(offsets_per_sentence[idx]))) if idx in offsets_per_sentence else None for idx in range(len(sentences_to_align))]
+        return estimated_starts
+
+    def build_index(self, original_text: Sentence):
+        """
+        Build an inverted index of the rare n-grams of the original text.
+
+        Params:
+            original_text (Sentence): original text
+
+        Returns:
+            index (Dict[Tuple[str, ...], List[int]]): word positions of every n-gram which occurs at most `max_ngram_occurrences` times
+        """
+        index: Dict[Tuple[str, ...], List[int]] = {}
+        for ngram, position in self.generate_ngrams(original_text.words_without_punct):
+            index.setdefault(ngram, []).append(position)
+        index = {ngram: positions for ngram, positions in index.items() if len(positions) <= self.max_ngram_occurrences}
+        return index
+
+    def find_anchors(self, index: Dict[Tuple[str, ...], List[int]], sentences_to_align: List[Sentence]):
+        """
+        Find all occurrences of indexed n-grams in the sentences to align.
+
+        Returns:
+            anchors (List[Tuple[int, int, int]]): sentence index, word index in the sentence and word position in the original text
+        """
+        anchors = []
+        for sentence_index, sentence in enumerate(sentences_to_align):
+            for ngram, word_index in self.generate_ngrams(sentence.words_without_punct):
+                for text_position in index.get(ngram, []):
+                    anchors.append((sentence_index, word_index, text_position))
+        return anchors
+
+    def chain(self, anchors: List[Tuple[int, int, int]]):
+        """
+        Select the longest chain of anchors whose text positions increase monotonically with the sentence order
+        (longest increasing subsequence), which drops anchors that are matched to the wrong part of the text.
+
+        Returns:
+            chained_anchors (List[Tuple[int, int, int]]): the anchors of the chain in sentence order
+        """
+        # anchors of the same sentence word are sorted by descending text position, so at most one of them is chained
+        anchors = sorted(anchors, key=lambda anchor: (anchor[0], anchor[1], -anchor[2]))
+        chain_ends: List[int] = []  # smallest text position at which a chain of length i + 1 ends
+        chain_end_indices: List[int] = []
+        predecessors: List[Optional[int]] = []
+        for anchor_index, (_, _, text_position) in enumerate(anchors):
+            length = bisect_left(chain_ends, text_position)
+            predecessors.append(chain_end_indices[length - 1] if length > 0 else None)
+            if length == len(chain_ends):
+                chain_ends.append(text_position)
+                chain_end_indices.append(anchor_index)
+            else:
+                chain_ends[length] = text_position
+                chain_end_indices[length] = anchor_index
+
+        chained_anchors = []
+        anchor_index = chain_end_indices[-1] if chain_end_indices else None
+        while anchor_index is not None:
+            chained_anchors.append(anchors[anchor_index])
+            anchor_index = predecessors[anchor_index]
+        return chained_anchors[::-1]
+
+    def generate_ngrams(self, words: List[str]):
+        """Generate all n-grams of a list of words together with the index of their first word."""
+        for position in range(len(words) - self.ngram_size + 1):
+            yield tuple(words[position:position + self.ngram_size]), position
@@ -3,11 +3,13 @@ from pandas.core.frame import DataFrame
 from huiAudioCorpus.converter.ListToHistogramConverter import ListToHistogramConverter
 from huiAudioCorpus.converter.ListToStatisticConverter import ListToStatisticConverter
 from huiAudioCorpus.persistence.AudioPersistence import AudioPersistence
+from huiAudioCorpus.persistence.AudioFeaturePersistence import AudioFeaturePersistence
 from joblib import Parallel, delayed
 
 class AudioStatisticComponent:
-    def __init__(self, audio_persistence: AudioPersistence, list_to_statistic_converter: ListToStatisticConverter, list_to_histogram_converter: ListToHistogramConverter):
+    def __init__(self, audio_persistence: AudioPersistence, list_to_statistic_converter: ListToStatisticConverter, list_to_histogram_converter: ListToHistogramConverter, audio_feature_persistence: AudioFeaturePersistence):
         self.audio_persistence = audio_persistence
+        self.audio_feature_persistence = audio_feature_persistence
         self.list_to_statistic_converter = list_to_statistic_converter
         self.list_to_histogram_converter = list_to_histogram_converter
         self.columns = ['id', 'duration', 'loudness', 'min_silence_db', 'sampling_rate', 'silence_percent', 'average_frequency']
@@ -32,13 +34,39 @@ class AudioStatisticComponent:
         return statistics, raw_data
 
     def load_audio_files(self):
-        result = Parallel(n_jobs=4, verbose=10, batch_size=100)(delayed(self.load_audio)(audio) for audio in self.audio_persistence.get_ids())
+        """Collects the statistic of every clip. The features of the sidecar in the audio folder are used where available,
+        only the remaining clips are decoded."""
+        ids = self.audio_persistence.get_ids()
+        features = self.audio_feature_persistence.load(self.audio_persistence.load_path)
+        missing_ids = [audio_id for audio_id in ids if audio_id not in features]
+        if len(features) > 0:
+            print(f"Using stored features for {len(ids) - len(missing_ids)} of {len(ids)} audios.")
+        decoded = Parallel(n_jobs=4, verbose=10, batch_size=100)(delayed(self.load_features)(audio_id) for audio_id in missing_ids)
+        features.update(zip(missing_ids, decoded))
+        result = [self.to_row(audio_id, features[audio_id]) for audio_id in ids]
         raw_data = DataFrame(result, columns=self.columns)
         raw_data = raw_data.set_index('id')
         return raw_data
 
     def load_audio(self, audio_id: str):
         audio = self.audio_persistence.load(audio_id)
-        return [audio.id.split("\\")[-1].split("/")[-1], round(audio.duration, 1), round(audio.loudness, 1),
-                round(audio.silence_db, 1), audio.sampling_rate, round(audio.silence_percent * 100),
-                round(audio.average_frequency)]
+        return self.to_row(audio.id, self.get_features(audio))
+
+    def load_features(self, audio_id: str):
+        return self.get_features(self.audio_persistence.load(audio_id))
+
+    def get_features(self, audio: Audio):
+        """Computes the unrounded features of the statistic, as stored in the feature sidecar."""
+        return {
+            'duration': audio.duration,
+            'loudness': audio.loudness,
+            'silence_db': audio.silence_db,
+            'sampling_rate': audio.sampling_rate,
+            'silence_percent': audio.silence_percent,
+            'average_frequency': audio.average_frequency
+        }
+
+    def to_row(self, audio_id: str, features: dict):
+        return [audio_id.split("\\")[-1].split("/")[-1], round(features['duration'], 1), round(features['loudness'], 1),
+                round(features['silence_db'], 1), features['sampling_rate'], round(features['silence_percent'] * 100),
+                round(features['average_frequency'])]
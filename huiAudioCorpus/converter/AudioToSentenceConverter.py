@@ -1,18 +1,32 @@
 from typing import List
 from huiAudioCorpus.persistence.AudioPersistence import AudioPersistence
+from huiAudioCorpus.persistence.AsrCachePersistence import AsrCachePersistence
 from huiAudioCorpus.transformer.AudioSamplingRateTransformer import AudioSamplingRateTransformer
 from huiAudioCorpus.model.Audio import Audio
 from huiAudioCorpus.model.Sentence import Sentence
 import numpy as np
 from tqdm import tqdm
+import torch
 import whisper
 # from whisper.tokenizer import get_tokenizer
 from huiAudioCorpus.utils.whisper_utils import get_language_code
+from huiAudioCorpus.utils.WhisperModelRegistry import WhisperModelRegistry
 
 
 class AudioToSentenceConverter:
-    def __init__(self, language):
+    def __init__(self, language, model_name: str = 'small', model_path: str = None, device: str = None, compute_type: str = None, asr_cache_persistence: AsrCachePersistence = None):
+        """
+        Params:
+            model_name: Whisper model size, choices: tiny (~1GB VRAM), base (~1GB), small (~2GB), medium (~5GB), large (~10GB)
+            model_path: path of a local checkpoint, used instead of `model_name` if given
+            device: torch device, defaults to CUDA if available
+            compute_type: "float32" or "float16", defaults to float16 on GPUs
+            asr_cache_persistence: cache of earlier transcripts, which are reused instead of running the model
+        """
         self.model = None
+        self.model_key = WhisperModelRegistry.resolve_key(model_path or model_name, device, compute_type)
+        self.fp16 = self.model_key[2] == 'float16'
+        self.asr_cache_persistence = asr_cache_persistence or AsrCachePersistence()
         self.whisper_sr = 16000
         self.whisper_sr_transformer = AudioSamplingRateTransformer(target_sampling_rate=self.whisper_sr)
         self.language = get_language_code(language)
@@ -26,17 +40,67 @@ class AudioToSentenceConverter:
         # ]            
         
 
-    def convert(self, audio: Audio):
+    def __getstate__(self):
+        # the model is not sent to worker processes, each worker loads its own
+        state = self.__dict__.copy()
+        state['model'] = None
+        return state
+
+    def load_model(self):
         if self.model is None:
-            print("Loading Whisper model")
-            self.model = whisper.load_model("small") # choices: tiny (~1GB VRAM), base (~1GB), small (~2GB), medium (~5GB), large (~10GB)
+            self.model = WhisperModelRegistry.get(*self.model_key)
+        return self.model
+
+    def get_cache_key(self, audio_sampled: Audio, method: str):
+        """The key covers everything that changes the transcript: the samples, the model and the decode options of `transcribe` or the batched `decode`."""
+        decode_options = {"language": self.language, "fp16": self.fp16, "method": method}
+        return self.asr_cache_persistence.get_key(audio_sampled.time_series, self.model_key[0], decode_options)
+
+    def convert(self, audio: Audio):
         audio_sampling_rate_transformer = self.whisper_sr_transformer
         audio_sampled = audio_sampling_rate_transformer.transform(audio)
-        # decode_options = {"language": self.decode_lang, "suppress_tokens": [-1] + self.number_tokens}
-        decode_options = {"language": self.language}
-        transcript = self.model.transcribe(audio_sampled.time_series, **decode_options)["text"]
-        sentence = Sentence(transcript, audio.id)
-        return sentence
+        return Sentence(self.transcribe(audio_sampled), audio.id)
+
+    def transcribe(self, audio_sampled: Audio):
+        cache_key = self.get_cache_key(audio_sampled, 'transcribe')
+        transcript = self.asr_cache_persistence.load(cache_key)
+        if transcript is None:
+            self.load_model()
+            # decode_options = {"language": self.decode_lang, "suppress_tokens": [-1] + self.number_tokens}
+            decode_options = {"language": self.language, "fp16": self.fp16}
+            transcript = self.model.transcribe(audio_sampled.time_series, **decode_options)["text"]
+            self.asr_cache_persistence.save(cache_key, transcript)
+        return transcript
+
+    def convert_batch(self, audios: List[Audio]):
+        """Transcribe several audios at once by decoding their padded log-mel spectrograms as one batch.
+        Audios longer than Whisper's 30 second window are transcribed one by one via `convert`.
+        Returns the recognized sentences in the order of the audios."""
+        sentences: List = [None] * len(audios)
+        batch_indices = []
+        batch_audios = []
+        for idx, audio in enumerate(audios):
+            audio_sampled = self.whisper_sr_transformer.transform(audio)
+            if audio_sampled.samples > whisper.audio.N_SAMPLES:
+                sentences[idx] = Sentence(self.transcribe(audio_sampled), audio.id)
+                continue
+            cache_key = self.get_cache_key(audio_sampled, 'decode')
+            transcript = self.asr_cache_persistence.load(cache_key)
+            if transcript is not None:
+                sentences[idx] = Sentence(transcript, audio.id)
+                continue
+            batch_indices.append(idx)
+            batch_audios.append((audio_sampled, cache_key))
+
+        if len(batch_audios) > 0:
+            model = self.load_model()
+            mels = [whisper.log_mel_spectrogram(whisper.pad_or_trim(audio_sampled.time_series.astype(np.float32)), n_mels=model.dims.n_mels) for audio_sampled, _ in batch_audios]
+            decode_options = whisper.DecodingOptions(language=self.language, fp16=self.fp16)
+            results = whisper.decode(model, torch.stack(mels).to(model.device), decode_options)
+            for idx, (_, cache_key), result in zip(batch_indices, batch_audios, results):
+                self.asr_cache_persistence.save(cache_key, result.text)
+                sentences[idx] = Sentence(result.text, audios[idx].id)
+        return sentences
 
 
 if __name__ == "__main__":
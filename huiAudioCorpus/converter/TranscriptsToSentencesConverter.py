@@ -6,5 +6,9 @@ class TranscriptsToSentencesConverter:
     def convert(self, transcripts: Transcripts):
         texts = transcripts.text
         ids = transcripts.keys
-        sentences = [Sentence(text, Path(id).stem) for text, id in zip(texts, ids)]
+        sentences = [self.convert_row(text, id) for text, id in zip(texts, ids)]
         return sentences
+
+    def convert_row(self, text: str, id: str):
+        """Creates the Sentence of one transcripts row, the ID of the sentence is the stem of the transcript key."""
+        return Sentence(text, Path(id).stem)
@@ -22,6 +22,7 @@ from huiAudioCorpus.workflows.createDatasetWorkflow.Step2_1_AudioStatistic impor
 from huiAudioCorpus.workflows.createDatasetWorkflow.Step6_FinalizeDataset import Step6_FinalizeDataset
 from huiAudioCorpus.transformer.SentenceDistanceTransformer import SentenceDistanceTransformer
 from huiAudioCorpus.calculator.AlignSentencesIntoTextCalculator import AlignSentencesIntoTextCalculator
+from huiAudioCorpus.calculator.AnchorChainCalculator import AnchorChainCalculator
 from huiAudioCorpus.workflows.createDatasetWorkflow.Step5_AlignText import Step5_AlignText
 from huiAudioCorpus.converter.AudioToSentenceConverter import AudioToSentenceConverter
 from huiAudioCorpus.workflows.createDatasetWorkflow.Step4_TranscriptAudio import Step4_TranscriptAudio
@@ -57,6 +58,8 @@ from huiAudioCorpus.transformer.TranscriptsSelectionTransformer import Transcrip
 from huiAudioCorpus.transformer.AudioSamplingRateTransformer import AudioSamplingRateTransformer
 from huiAudioCorpus.persistence.TranscriptsPersistence import TranscriptsPersistence
 from huiAudioCorpus.persistence.AudioPersistence import AudioPersistence
+from huiAudioCorpus.persistence.AsrCachePersistence import AsrCachePersistence
+from huiAudioCorpus.persistence.AudioFeaturePersistence import AudioFeaturePersistence
 from huiAudioCorpus.filter.AudioFilter import AudioFilter
 from huiAudioCorpus.transformer.AudioFadeTransformer import AudioFadeTransformer
 from huiAudioCorpus.calculator.TextNormalizer import TextNormalizer
@@ -78,6 +81,7 @@ class DependencyInjection:
     # assign all the __annotations__ to DependencyInjection.__dict__
     # Calculators
     align_sentences_into_text_calculator: AlignSentencesIntoTextCalculator
+    anchor_chain_calculator: AnchorChainCalculator
     text_normalizer: TextNormalizer
 
     # Components
@@ -103,6 +107,8 @@ class DependencyInjection:
     transcripts_persistence: TranscriptsPersistence
     audios_from_librivox_persistence: AudiosFromLibrivoxPersistence
     gutenberg_book_persistence: GutenbergBookPersistence
+    asr_cache_persistence: AsrCachePersistence
+    audio_feature_persistence: AudioFeaturePersistence
 
     # Transformers
     audio_add_silence_transformer: AudioAddSilenceTransformer
@@ -140,12 +146,19 @@ class DependencyInjection:
     def __init__(self, config={}):
         config_with_default = default_config.copy()
         config_with_default.update(config)
+        self.config = config_with_default
         self.all_class_references = self.get_all_class_references(config_with_default)
-        initialed_classes = {}
-        for name, class_instance in self.all_class_references.items():
-            def get_lambda(name, class_instance):
-                return property(lambda _: self.init_class(name, class_instance, self.class_constructor, initialed_classes, config_with_default, name))
-            setattr(DependencyInjection, name, get_lambda(name, class_instance))
+        self.initialed_classes = {}
+        for name in self.all_class_references:
+            # the property resolves the class with the state of the instance it is accessed on, so instances created by several threads do not share a configuration
+            def get_lambda(name):
+                return property(lambda instance: instance.get_class(name))
+            setattr(DependencyInjection, name, get_lambda(name))
+
+    def get_class(self, name):
+        if name not in self.all_class_references:
+            raise AttributeError(name)
+        return self.init_class(name, self.all_class_references[name], self.class_constructor, self.initialed_classes, self.config, name)
 
     def init_class(self, class_name, class_reference, class_constructor_method, initialed_classes, config, requested_class=''):
         if class_name in initialed_classes:
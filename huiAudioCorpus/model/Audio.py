@@ -12,6 +12,25 @@ class Audio(ToString):
         self.name = name
         self.id = audio_id
 
+    @property
+    def time_series(self):
+        return self._time_series
+
+    @time_series.setter
+    def time_series(self, time_series: NDArray):
+        self._time_series = time_series
+        self.invalidate_features()
+
+    def invalidate_features(self):
+        """Clears the cached features. Must be called after the samples were changed in place."""
+        self.features = {}
+
+    def get_feature(self, name: str, compute):
+        """Returns the cached feature `name`, computing it with `compute` on first access."""
+        if name not in self.features:
+            self.features[name] = compute()
+        return self.features[name]
+
     @property
     def samples(self) -> int:
         return self.time_series.shape[0]
@@ -21,8 +40,7 @@ class Audio(ToString):
         return self.samples / self.sampling_rate
 
     def __add__(self, other: 'Audio') -> 'Audio':
-        audio_time_series = self.time_series.tolist() + other.time_series.tolist()
-        audio_time_series = np.array(audio_time_series)
+        audio_time_series = np.concatenate([self.time_series, other.time_series])
         audio_id = self.id + '&' + other.id
         name = self.name + '&' + other.name
 
@@ -39,19 +57,36 @@ class Audio(ToString):
 
     @property
     def loudness(self) -> float:
+        return self.get_feature('loudness', self.compute_loudness)
+
+    def compute_loudness(self) -> float:
         meter = pyln.Meter(self.sampling_rate)  # create BS.1770 meter
         loudness = meter.integrated_loudness(self.time_series)
         return loudness
 
     @property
     def silence_db(self) -> float:
+        return self.get_feature('silence_db', self.compute_silence_db)
+
+    def compute_silence_db(self) -> float:
+        """The highest integer threshold `top_db` in 100..2 for which `librosa.effects.split` finds more than one interval, negated (0 if there is none).
+        Instead of splitting once per threshold, it is derived from one frame dB envelope: a frame j separates two intervals at threshold t
+        if it is silent (db[j] <= -t) and there are louder frames on both sides (min(max(db[:j]), max(db[j+1:])) > -t).
+        So frame j works for all integers t in (-min(max(db[:j]), max(db[j+1:])), -db[j]], and the result is the largest of these over all frames."""
         silence_duration_in_seconds = 0.05
         frame_length = int(silence_duration_in_seconds * self.sampling_rate)
-        for silence_decibel in range(100, 1, -1):
-            splitted = librosa.effects.split(y=self.time_series, top_db=silence_decibel, frame_length=frame_length, hop_length=int(frame_length / 4))
-            if len(splitted) > 1:
-                return -silence_decibel
-        return 0
+        rms = librosa.feature.rms(y=self.time_series, frame_length=frame_length, hop_length=int(frame_length / 4))
+        db = librosa.amplitude_to_db(rms[0], ref=np.max, top_db=None)
+        if len(db) < 3:
+            return 0
+        loudest_before = np.maximum.accumulate(db)[:-2]
+        loudest_after = np.maximum.accumulate(db[::-1])[::-1][2:]
+        gap_db = db[1:-1]
+        highest_thresholds = np.minimum(100, np.floor(-gap_db))
+        is_valid = (highest_thresholds > -np.minimum(loudest_before, loudest_after)) & (highest_thresholds >= 2)
+        if not is_valid.any():
+            return 0
+        return -int(highest_thresholds[is_valid].max())
 
     @property
     def silence_percent(self) -> float:
@@ -59,8 +94,21 @@ class Audio(ToString):
         silence_percent = 1 - sum(states) / len(states)
         return silence_percent
 
+    @property
+    def rms(self):
+        """Frame-wise RMS with the default librosa framing (2048 samples, hop 512)."""
+        return self.get_feature('rms', lambda: librosa.feature.rms(y=self.time_series)[0])  # type: ignore
+
+    @property
+    def magnitude_spectrogram(self):
+        """Magnitude STFT with the same framing as the RMS frames, shared by the spectral features."""
+        return self.get_feature('magnitude_spectrogram', lambda: np.abs(librosa.stft(y=self.time_series)))
+
     def is_loud(self):
-        rms = librosa.feature.rms(y=self.time_series)[0]  # type: ignore
+        return self.get_feature('is_loud', self.compute_is_loud)
+
+    def compute_is_loud(self):
+        rms = self.rms
         r_normalized = (rms - 0.02) / np.std(rms)
         p = np.exp(r_normalized) / (1 + np.exp(r_normalized))  # type: ignore
         transition = librosa.sequence.transition_loop(2, [0.5, 0.6])
@@ -70,8 +118,11 @@ class Audio(ToString):
 
     @property
     def average_frequency(self) -> float:
+        return self.get_feature('average_frequency', self.compute_average_frequency)
+
+    def compute_average_frequency(self) -> float:
         try:
-            cent = librosa.feature.spectral_centroid(y=self.time_series, sr=self.sampling_rate)[0]  # type: ignore
+            cent = librosa.feature.spectral_centroid(S=self.magnitude_spectrogram, sr=self.sampling_rate)[0]  # type: ignore
             loud_positions = self.is_loud()
             cent_at_loud = [cent[index] for index in range(len(cent)) if loud_positions[index] == 1]
             average_frequency = round(average(cent_at_loud))  # type: ignore
@@ -0,0 +1,60 @@
+"""
+Copyright 2024 Lyonel Behringer
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from huiAudioCorpus.model.Audio import Audio
+
+class AudioClip(Audio):
+    """
+    View on the samples [start, end) of a parent Audio, e.g. one clip of a chapter while it is split.
+    Behaves like an Audio, but `time_series` is a view into the buffer of the parent, so splitting and merging clips copies no samples.
+    Changes to the samples of a clip (e.g. fading) are written into the parent buffer.
+    Params:
+        parent (Audio): the audio the clip refers to
+        start (int): index of the first sample of the clip
+        end (int): index after the last sample of the clip
+    """
+
+    def __init__(self, parent: Audio, start: int, end: int, audio_id: str, name: str):
+        self.parent = parent
+        self.start = start
+        self.end = end
+        self.sampling_rate = parent.sampling_rate
+        self.id = audio_id
+        self.name = name
+        self.features = {}
+
+    @property
+    def time_series(self):
+        return self.parent.time_series[self.start:self.end]
+
+    def invalidate_features(self):
+        # the samples are shared with the parent, so its features are outdated as well
+        self.features = {}
+        self.parent.invalidate_features()
+
+    def __add__(self, other: Audio) -> Audio:
+        """Adjacent clips of the same parent are merged into one clip covering both ranges, other audios are concatenated."""
+        if isinstance(other, AudioClip) and other.parent is self.parent and other.start == self.end:
+            return AudioClip(self.parent, self.start, other.end, self.id + '&' + other.id, self.name + '&' + other.name)
+        return self.to_audio() + other
+
+    def to_audio(self) -> Audio:
+        """Copies the samples of the clip into an own contiguous array with the dtype of the parent."""
+        return Audio(self.time_series.copy(), self.sampling_rate, self.id, self.name)
+
+    def __reduce__(self):
+        # only the samples of the clip are sent to other processes, not the whole parent buffer
+        return (AudioClip, (self.to_audio(), 0, self.end - self.start, self.id, self.name))
@@ -18,8 +18,10 @@ limitations under the License.
 from os import error
 from textblob import TextBlob
 from huiAudioCorpus.utils.ModelToStringConverter import ToString
+from huiAudioCorpus.model.SentenceSpan import SentenceSpan
 from typing import List, Union
 from string import punctuation
+from itertools import accumulate
 import re
 
 class Sentence(ToString):
@@ -31,12 +33,7 @@ class Sentence(ToString):
     """
 
     def __init__(self, sentence: str, id: str = ''):
-        sentence = self.clean_spaces(sentence)
-        # clean spaces around punctuation in the sentence
-        sentence = self.clean_spaces_punctuation(sentence)
-        if " ' " in sentence:
-            sentence = self.postprocess_split_contraction_apostrophes(sentence)
-
+        sentence = self.clean_sentence(sentence)
 
         self.sentence = sentence
         self.id = id
@@ -59,9 +56,20 @@ class Sentence(ToString):
         self.char_count = len(self.sentence)
         self.words_matching_with_punct = self.generate_words_matching_with_punct(self.words, self.words_without_punct)
         self.raw_chars = "".join(self.words_without_punct)
+        # character offset in `raw_chars` at which each word starts, with the total number of characters appended
+        self.char_offsets: List[int] = list(accumulate((len(word) for word in self.words_without_punct), initial=0))
 
 
 
+    def clean_sentence(self, sentence: str):
+        """Clean spaces (also around punctuation) and recombine split contraction apostrophes. Returns the cleaned string."""
+        sentence = self.clean_spaces(sentence)
+        # clean spaces around punctuation in the sentence
+        sentence = self.clean_spaces_punctuation(sentence)
+        if " ' " in sentence:
+            sentence = self.postprocess_split_contraction_apostrophes(sentence)
+        return sentence
+
     def postprocess_split_contraction_apostrophes(self, toks: Union[List, str]):
         """Recombine contractions that were split by TextBlob such that apostrophes are separate (e.g. `don ' t` -> `don't`).
         Returns the postprocessed string."""
@@ -134,6 +142,35 @@ class Sentence(ToString):
         """
         return Sentence(" ".join(self.words_matching_with_punct[k]))
 
+    def span(self, start: int, end: int):
+        """
+        Get a view on the words [start, end) which shares the already tokenized words of this sentence.
+
+        Params:
+            start (int): index of the first word
+            end (int): index after the last word
+
+        Returns:
+            SentenceSpan: a view on the words of this sentence
+        """
+        return SentenceSpan(self, start, end)
+
+    def raw_chars_span(self, start: int, end: int):
+        """
+        Get the concatenated words without punctuation of the words [start, end) via the precomputed character offsets.
+
+        Params:
+            start (int): index of the first word
+            end (int): index after the last word
+
+        Returns:
+            str: the characters of the words in the given range
+        """
+        start, end, _ = slice(start, end).indices(self.words_count)
+        if end <= start:
+            return ''
+        return self.raw_chars[self.char_offsets[start]:self.char_offsets[end]]
+
     def generate_words_matching_with_punct(self, words:List[str], words_without_punct: List[str]):
         """
         Generate words matching with punctuation.
@@ -0,0 +1,77 @@
+"""
+Copyright 2024 Lyonel Behringer
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from functools import cached_property
+from typing import List
+from huiAudioCorpus.utils.ModelToStringConverter import ToString
+
+class SentenceSpan(ToString):
+    """
+    Lightweight view on the words [start, end) of an already tokenized Sentence.
+    Exposes the same word attributes as a Sentence, but derives them lazily from the parent instead of tokenizing again.
+    Params:
+        parent (Sentence): the tokenized sentence the span refers to
+        start (int): index of the first word of the span (in `words_without_punct` of the parent)
+        end (int): index after the last word of the span
+        id (str): An optional identifier for the span
+    """
+
+    def __init__(self, parent, start: int, end: int, id: str = ''):
+        self.parent = parent
+        self.start, self.end, _ = slice(start, end).indices(parent.words_count)
+        self.end = max(self.start, self.end)
+        self.id = id
+
+    @property
+    def words_count(self) -> int:
+        return self.end - self.start
+
+    @cached_property
+    def words_without_punct(self) -> List[str]:
+        return self.parent.words_without_punct[self.start:self.end]
+
+    @cached_property
+    def words_without_punct_and_cased(self) -> List[str]:
+        return self.parent.words_without_punct_and_cased[self.start:self.end]
+
+    @cached_property
+    def words_matching_with_punct(self) -> List[str]:
+        return self.parent.words_matching_with_punct[self.start:self.end]
+
+    @cached_property
+    def sentence(self) -> str:
+        return self.parent.clean_sentence(" ".join(self.words_matching_with_punct))
+
+    @property
+    def char_count(self) -> int:
+        return len(self.sentence)
+
+    @property
+    def raw_chars(self) -> str:
+        return self.parent.raw_chars_span(self.start, self.end)
+
+    def __getitem__(self, k):
+        """
+        Get a span of this span, relative to its start.
+
+        Params:
+            k (slice): the word range to retrieve
+
+        Returns:
+            SentenceSpan: a new span sharing the same parent
+        """
+        start, end, _ = k.indices(self.words_count)
+        return SentenceSpan(self.parent, self.start + start, self.start + end)
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import numpy as np
+from huiAudioCorpus.utils.PathUtil import PathUtil
+
+class AsrCachePersistence:
+    """On-disk cache of ASR transcripts. An entry is keyed by a hash of the 16 kHz samples, the model and the decode options,
+    and is stored as a small JSON file in a folder named after the first two characters of the key.
+    Without a `cache_path` the cache is disabled."""
+
+    def __init__(self, cache_path: str = None, max_size_bytes: int = 1024 ** 3):
+        self.cache_path = cache_path
+        self.max_size_bytes = max_size_bytes
+        self.path_util = PathUtil()
+        self.hits = 0
+        self.misses = 0
+        self.size_bytes = None
+
+    def is_enabled(self):
+        return self.cache_path is not None
+
+    def get_key(self, samples: np.ndarray, model_name: str, decode_options: dict):
+        hash = hashlib.sha256()
+        hash.update(np.ascontiguousarray(samples, dtype=np.float32).tobytes())
+        hash.update(json.dumps({'model': model_name, **decode_options}, sort_keys=True).encode('utf8'))
+        return hash.hexdigest()
+
+    def get_entry_path(self, key: str):
+        return os.path.join(self.cache_path, key[:2], key + '.json')
+
+    def load(self, key: str):
+        """Returns the cached transcript or None, and counts the hit or miss."""
+        if not self.is_enabled():
+            return None
+        entry_path = self.get_entry_path(key)
+        try:
+            with open(entry_path, 'r', encoding='utf8') as f:
+                transcript = json.load(f)['text']
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        # the modification time marks the last use for the eviction
+        os.utime(entry_path)
+        self.hits += 1
+        return transcript
+
+    def save(self, key: str, transcript: str):
+        if not self.is_enabled():
+            return
+        entry_path = self.get_entry_path(key)
+        self.path_util.create_folder_for_file(entry_path)
+        # written to a temporary file first, so that parallel workers never read a partial entry
+        temporary_path = f'{entry_path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'w', encoding='utf8') as f:
+            json.dump({'text': transcript}, f, ensure_ascii=False)
+        os.replace(temporary_path, entry_path)
+        if self.size_bytes is None:
+            self.size_bytes = self.get_size()
+        else:
+            self.size_bytes += os.path.getsize(entry_path)
+        if self.size_bytes > self.max_size_bytes:
+            self.evict()
+
+    def get_entries(self):
+        entries = []
+        for shard in os.scandir(self.cache_path):
+            if shard.is_dir():
+                entries.extend(entry for entry in os.scandir(shard.path) if entry.name.endswith('.json'))
+        return entries
+
+    def get_size(self):
+        return sum(entry.stat().st_size for entry in self.get_entries())
+
+    def evict(self):
+        """Deletes the least recently used entries until the cache is below 90% of `max_size_bytes`."""
+        entries = sorted(self.get_entries(), key=lambda entry: entry.stat().st_mtime)
+        self.size_bytes = sum(entry.stat().st_size for entry in entries)
+        target_size = 0.9 * self.max_size_bytes
+        for entry in entries:
+            if self.size_bytes <= target_size:
+                break
+            size = entry.stat().st_size
+            try:
+                os.unlink(entry.path)
+            except FileNotFoundError:
+                # already removed by another worker
+                pass
+            self.size_bytes -= size
+
+    def get_summary(self):
+        requests = self.hits + self.misses
+        hit_rate = self.hits / requests * 100 if requests > 0 else 0
+        return f"ASR cache: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate)."
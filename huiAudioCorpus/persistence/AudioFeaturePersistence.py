@@ -0,0 +1,41 @@
+import os
+from typing import Dict
+import numpy as np
+from huiAudioCorpus.utils.PathUtil import PathUtil
+
+feature_names = ['duration', 'loudness', 'silence_db', 'sampling_rate', 'silence_percent', 'average_frequency']
+
+class AudioFeaturePersistence:
+    """Sidecar file with the statistic features of the clips in an audio folder, so the statistics do not need to decode the clips again.
+    The file is an NPZ archive in the audio folder with one array of clip IDs (relative to the folder, like `AudioPersistence.get_ids`) and one array per feature."""
+
+    def __init__(self, file_name: str = 'features.npz'):
+        self.file_name = file_name
+        self.path_util = PathUtil()
+
+    def get_path(self, folder: str):
+        return os.path.join(folder, self.file_name)
+
+    def exists(self, folder: str):
+        return os.path.isfile(self.get_path(folder))
+
+    def load(self, folder: str) -> Dict[str, dict]:
+        """Returns the features of every clip by ID, or an empty dict if the folder has no sidecar."""
+        if not self.exists(folder):
+            return {}
+        with np.load(self.get_path(folder)) as archive:
+            columns = {name: archive[name].tolist() for name in feature_names}
+            ids = archive['id'].tolist()
+        return {audio_id: {name: columns[name][index] for name in feature_names} for index, audio_id in enumerate(ids)}
+
+    def save(self, folder: str, features: Dict[str, dict]):
+        """Writes the features of the given clips, replacing an existing sidecar of the folder."""
+        target_path = self.get_path(folder)
+        self.path_util.create_folder_for_file(target_path)
+        ids = list(features.keys())
+        columns = {name: np.array([features[audio_id][name] for audio_id in ids]) for name in feature_names}
+        # written to a temporary file first, so an interrupted write does not leave a broken sidecar
+        temporary_path = target_path + '.tmp'
+        with open(temporary_path, 'wb') as f:
+            np.savez(f, id=np.array(ids, dtype=str), **columns)
+        os.replace(temporary_path, target_path)
@@ -1,16 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List
+import os
+import shutil
 import librosa
 import soundfile
+from tqdm import tqdm
 from huiAudioCorpus.model.Audio import Audio
 from nptyping import NDArray
 from huiAudioCorpus.utils.FileListUtil import FileListUtil
 from huiAudioCorpus.utils.PathUtil import PathUtil
 from natsort import natsorted
+try:
+    import fcntl
+except ImportError:
+    # not available on Windows, where files are copied instead
+    fcntl = None
+
+transfer_modes = ['auto', 'reflink', 'hardlink', 'copy']
+# ioctl request of Linux to clone the extents of a file (copy-on-write)
+FICLONE = 0x40049409
 
 class AudioPersistence:
-    def __init__(self, load_path: str, save_path: str = None, file_extension: str = 'wav'):
+    def __init__(self, load_path: str, save_path: str = None, file_extension: str = 'wav', transfer_mode: str = 'auto', number_of_transfer_workers: int = 8):
+        """
+        Params:
+            transfer_mode: how `transfer` copies files: "reflink" clones them (copy-on-write), "hardlink" links them, "copy" copies the bytes,
+                "auto" tries a reflink and falls back to copying
+            number_of_transfer_workers: threads that transfer files at the same time
+        """
+        if transfer_mode not in transfer_modes:
+            raise ValueError(f"Transfer mode {transfer_mode} is not supported, choose one of {transfer_modes}.")
         self.save_path = load_path if save_path is None else save_path
         self.load_path = load_path
         self.file_extension = file_extension
+        self.transfer_mode = transfer_mode
+        self.number_of_transfer_workers = number_of_transfer_workers
         self.file_list_util = FileListUtil()
         self.path_util = PathUtil()
 
@@ -38,6 +62,61 @@ class AudioPersistence:
         sampling_rate = audio.sampling_rate
         soundfile.write(target_path, audio_time_series, sampling_rate)
 
+    def transfer(self, audio_ids: List[str], target_ids: List[str] = None, transform: Callable[[Audio], Audio] = None, on_transferred: Callable[[str], None] = None):
+        """Copies audio files from `load_path` to `save_path` in a thread pool, optionally under new IDs.
+        Files are transferred without decoding, unless they have to be converted to wav or a `transform` (e.g. resampling) is given.
+        `on_transferred` is called in the calling thread with the ID of every finished file."""
+        target_ids = audio_ids if target_ids is None else target_ids
+        needs_decoding = transform is not None or self.file_extension != 'wav'
+        transfer_one = self.convert_one if needs_decoding else self.transfer_one
+        with ThreadPoolExecutor(max_workers=self.number_of_transfer_workers) as executor:
+            futures = {executor.submit(transfer_one, audio_id, target_id, transform): audio_id for audio_id, target_id in zip(audio_ids, target_ids)}
+            for future in tqdm(as_completed(futures), total=len(futures)):
+                future.result()
+                if on_transferred is not None:
+                    on_transferred(futures[future])
+
+    def convert_one(self, audio_id: str, target_id: str, transform: Callable[[Audio], Audio] = None):
+        audio = self.load(audio_id)
+        if transform is not None:
+            audio = transform(audio)
+        audio.id = target_id
+        self.save(audio)
+
+    def transfer_one(self, audio_id: str, target_id: str, transform=None):
+        source_path = self.load_path + '/' + audio_id + '.' + self.file_extension
+        target_path = self.save_path + '/' + target_id + '.wav'
+        if os.path.abspath(source_path) == os.path.abspath(target_path):
+            return
+        self.path_util.create_folder_for_file(target_path)
+        # the file is created under a temporary name, so an interrupted transfer never leaves a partial file under the target name
+        temporary_path = target_path + '.part'
+        if os.path.lexists(temporary_path):
+            os.unlink(temporary_path)
+        if self.transfer_mode == 'hardlink':
+            os.link(source_path, temporary_path)
+        elif self.transfer_mode == 'reflink':
+            self.reflink(source_path, temporary_path)
+        elif self.transfer_mode == 'copy':
+            shutil.copyfile(source_path, temporary_path)
+        else:
+            try:
+                self.reflink(source_path, temporary_path)
+            except OSError:
+                shutil.copyfile(source_path, temporary_path)
+        os.replace(temporary_path, target_path)
+
+    def reflink(self, source_path: str, target_path: str):
+        if fcntl is None:
+            raise OSError("Reflinks are not supported on this platform.")
+        with open(source_path, 'rb') as source, open(target_path, 'wb') as target:
+            try:
+                fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+            except OSError:
+                target.close()
+                os.unlink(target_path)
+                raise
+
     def get_names(self):
         names = [self.path_util.filename_without_extension(audio_id) for audio_id in self.get_ids()]
         return names
@@ -1,6 +1,7 @@
 from huiAudioCorpus.model.AudioTranscriptPair import AudioTranscriptPair
 from huiAudioCorpus.error.MatchingNotFoundError import MatchingNotFoundError
-from typing import List
+from pathlib import Path
+from typing import Dict, List, Tuple
 from huiAudioCorpus.converter.TranscriptsToSentencesConverter import TranscriptsToSentencesConverter
 from huiAudioCorpus.persistence.AudioPersistence import AudioPersistence
 from huiAudioCorpus.persistence.TranscriptsPersistence import TranscriptsPersistence
@@ -11,17 +12,39 @@ class AudioTranscriptPairPersistence:
         self.audio_persistence = audio_persistence
         self.transcripts_persistence = transcripts_persistence
         self.transcripts_to_sentences_converter = transcripts_to_sentences_converter
+        self.texts: List[List[str]] = None
+        self.keys: List[List[str]] = None
+        self.sentence_index: Dict[str, Tuple[int, int]] = None
 
     def load(self, audio_id: str, sentence_id: str):
         audio = self.audio_persistence.load(audio_id)
-        sentence = self.get_all_sentences()[sentence_id]
+        sentence = self.get_sentence(sentence_id)
         element_pair = AudioTranscriptPair(sentence, audio)
         return element_pair
 
+    def get_sentence_index(self):
+        """Loads the transcripts once and maps every sentence ID to its transcripts file and row, without tokenizing the sentences.
+        Like `get_all_sentences`, the ID is the stem of the transcript key, and a later row wins over an earlier one with the same ID."""
+        if self.sentence_index is None:
+            self.texts = []
+            self.keys = []
+            self.sentence_index = {}
+            for transcripts_index, transcripts in enumerate(self.transcripts_persistence.load_all()):
+                self.texts.append(transcripts.text)
+                self.keys.append(transcripts.keys)
+                for row, key in enumerate(transcripts.keys):
+                    self.sentence_index[Path(key).stem] = (transcripts_index, row)
+        return self.sentence_index
+
+    def get_sentence(self, sentence_id: str):
+        """Converts the indexed transcripts row of one ID to its Sentence, like `get_all_sentences` converts all rows."""
+        transcripts_index, row = self.get_sentence_index()[sentence_id]
+        return self.transcripts_to_sentences_converter.convert_row(self.texts[transcripts_index][row], self.keys[transcripts_index][row])
+
     def get_ids(self, check_for_consistency=True):
         audio_ids = self.audio_persistence.get_ids()
         audio_names = self.audio_persistence.get_names()
-        sentences_ids = list(self.get_all_sentences().keys())
+        sentences_ids = list(self.get_sentence_index().keys())
 
         if check_for_consistency:
             self.check_ids(audio_names, sentences_ids)
@@ -50,13 +73,17 @@ class AudioTranscriptPairPersistence:
         return sentence_dict
 
     def check_ids(self, audio_ids: List[str], sentence_ids: List[str]):
-        missing_audio_ids = [id for id in sentence_ids if not id in audio_ids]
-        missing_sentence_ids = [id for id in audio_ids if not id in sentence_ids]
+        audio_id_set = set(audio_ids)
+        sentence_id_set = set(sentence_ids)
+        missing_audio_ids = [id for id in sentence_ids if not id in audio_id_set]
+        missing_sentence_ids = [id for id in audio_ids if not id in sentence_id_set]
         if missing_audio_ids or missing_sentence_ids:
             raise MatchingNotFoundError(missing_audio_ids, missing_sentence_ids, 'audioFiles', 'Transcripts')
 
     def remove_nonexistent_ids(self, audio_ids: List[str], audio_names: List[str], sentence_ids: List[str]):
-        audio_ids = [id for id, name in zip(audio_ids, audio_names) if name in sentence_ids]
-        audio_names = [name for name in audio_names if name in sentence_ids]
-        sentence_ids = [id for id in sentence_ids if id in audio_names]
+        sentence_id_set = set(sentence_ids)
+        audio_ids = [id for id, name in zip(audio_ids, audio_names) if name in sentence_id_set]
+        audio_names = [name for name in audio_names if name in sentence_id_set]
+        audio_name_set = set(audio_names)
+        sentence_ids = [id for id in sentence_ids if id in audio_name_set]
         return audio_ids, audio_names, sentence_ids
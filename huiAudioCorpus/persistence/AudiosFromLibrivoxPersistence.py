@@ -18,10 +18,10 @@ limitations under the License.
 import bs4 as bs
 import pandas as pd
 from huiAudioCorpus.utils.PathUtil import PathUtil
+from huiAudioCorpus.utils.DownloadManager import DownloadManager
+from huiAudioCorpus.persistence.LibrivoxCatalogCrawler import LibrivoxCatalogCrawler
 import requests
 import json
-from tqdm import tqdm
-from joblib import Parallel, delayed
 from urllib.parse import quote
 from typing import Union
 import time
@@ -41,7 +41,10 @@ class AudiosFromLibrivoxPersistence:
                   limit_per_iteration: int = 1000,
                   max_iterations: int = 20,
                   max_chapters_per_reader: int = None,
-                  start_timestamp: int = None):
+                  start_timestamp: int = None,
+                  number_of_download_connections: int = 4,
+                  crawl_cache_path: str = None,
+                  max_concurrent_requests: int = 8):
         self.reader = reader
         self.book_name = book_name
         self.url = url
@@ -51,6 +54,8 @@ class AudiosFromLibrivoxPersistence:
         self.chapter_path = chapter_path
         self.hifi_qa_save_path = hifi_qa_save_path
         self.path_util = PathUtil()
+        self.download_manager = DownloadManager(number_of_download_connections)
+        self.catalog_crawler = LibrivoxCatalogCrawler(crawl_cache_path, max_concurrent_requests)
         self.limit_per_iteration = limit_per_iteration
         self.max_iterations = max_iterations
         self.max_chapters_per_reader = max_chapters_per_reader
@@ -62,8 +67,7 @@ class AudiosFromLibrivoxPersistence:
         if self.reader is None:
             raise Exception("Reader must be specified for saving Hifi QA stats!")
         chapters, download_link_dict = self.get_chapters(self.book_name, get_download_links=True)
-        Parallel(n_jobs=1)(delayed(self.path_util.copy_file_from_url) \
-                        (download_link_dict[key], self.save_path + '/' + download_link_dict[key].split('/')[-1]) for key in sorted(download_link_dict)[:self.max_chapters_per_reader])
+        self.download_manager.download_all([(download_link_dict[key], self.save_path + '/' + download_link_dict[key].split('/')[-1]) for key in sorted(download_link_dict)[:self.max_chapters_per_reader]])
         chapters.to_csv(self.chapter_path)
 
         # save hifi_qa stats (reader specific)
@@ -81,17 +85,6 @@ class AudiosFromLibrivoxPersistence:
         chapters = pd.read_html(chapter_url)
         return chapters[0], chapter_download_link_dict
 
-    def get_catalog_date(self, search_url: str):
-        search_result = requests.get(search_url)
-        search_result.encoding = "UTF-8"
-        soup = bs.BeautifulSoup(search_result.text, 'html.parser')
-        try:
-            production_details = soup.find("dl", class_="product-details")
-            catalog_date = production_details.find_all("dd")[2].text
-        except:
-            catalog_date = "0000-00-00" # placeholder as `oldest` book
-        return int(catalog_date.replace("-", ""))
-
     def load_search_book(self, url: str):
         search_result = requests.get(url)
         return search_result.text
@@ -132,46 +125,14 @@ class AudiosFromLibrivoxPersistence:
         return download_link_dict
 
     def get_ids(self, language, request_url=None):
-        books = []
+        """Returns the books of the LibriVox feed. Usable books also get their catalog date and chapters, see `LibrivoxCatalogCrawler`."""
         if request_url:
             print("Using custom request URL for metadata retrieval.")
-            page = requests.get(request_url)
-            page.encoding = "UTF-8"
-            try:
-                result = json.loads(page.text)
-                if 'books' in result:
-                    for idx, book in enumerate(result['books']):
-                        if is_book_useable(book, language):
-                            result['books'][idx]['catalog_date'] = self.get_catalog_date(book['url_librivox'])
-                    books.extend(result['books'])
-                else:
-                    print(result)
-                    print("Stopping download of overview metadata.")
-            except ValueError as e:
-                print(f"caught ValueError: {e}")
-                print("Stopping download of overview metadata.")
+            feed_urls = [request_url]
         else:
             limit = self.limit_per_iteration
-            for i in tqdm(range(self.max_iterations), desc=f"Performing retrieval in max. {self.max_iterations} iterations"):
-                request_url = f'https://librivox.org/api/feed/audiobooks/?limit={limit}&offset={i*limit}&since={self.start_timestamp}&format=json'
-                page = requests.get(request_url)
-                page.encoding = "UTF-8"
-                try:
-                    result = json.loads(page.text)
-                    if 'books' in result:
-                        for idx, book in enumerate(tqdm(result['books'], desc=f"Getting catalog dates for usable books, iteration {i+1}")):
-                            if is_book_useable(book, language):
-                                result['books'][idx]['catalog_date'] = self.get_catalog_date(book['url_librivox'])
-                        books.extend(result['books'])
-                    else:
-                        print(result)
-                        print("Stopping download of overview metadata.")
-                        break
-                except ValueError as e:
-                    print(f"Error in iteration {i}: {e}")
-                    print("Stopping download of overview metadata.")
-                    break
-        return books
+            feed_urls = [f'{self.url}api/feed/audiobooks/?limit={limit}&offset={i*limit}&since={self.start_timestamp}&format=json' for i in range(self.max_iterations)]
+        return self.catalog_crawler.get_books(feed_urls, lambda book: is_book_useable(book, language))
 
 def is_book_useable(book, language):
     """Determines whether or not a book is usable for dataset creation.
@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import io
+import json
+import os
+import random
+from typing import Callable, Dict, List
+import aiohttp
+import bs4 as bs
+import pandas as pd
+from tqdm import tqdm
+from huiAudioCorpus.utils.JsonlJournal import JsonlJournal
+from huiAudioCorpus.utils.PathUtil import PathUtil
+
+class LibrivoxCatalogCrawler:
+    """Crawls the LibriVox catalog with asyncio: the pages of the API feed are requested in batches of `feed_pages_per_batch` pages at the same time
+    up to the first page without books, and the catalog page of every usable book is requested once to get its catalog date and its chapter table. At most `max_concurrent_requests` requests are open at a time, failed requests
+    are retried with exponential backoff.
+
+    With a `cache_path`, responses are cached on disk and revalidated with ETag/Last-Modified, and the details of every crawled book are kept
+    in `books.jsonl`, so a new crawl only requests the catalog pages of books that are new since the last crawl."""
+    retry_statuses = [429, 500, 502, 503, 504]
+
+    def __init__(self, cache_path: str = None, max_concurrent_requests: int = 8, max_retries: int = 4, backoff_seconds: float = 1.0, timeout: float = 60,
+                 feed_pages_per_batch: int = 4):
+        self.cache_path = cache_path
+        self.feed_pages_per_batch = feed_pages_per_batch
+        self.max_concurrent_requests = max_concurrent_requests
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout = timeout
+        self.path_util = PathUtil()
+        self.books = JsonlJournal(os.path.join(cache_path, 'books.jsonl')) if cache_path is not None else None
+
+    def get_books(self, feed_urls: List[str], is_book_useable: Callable[[dict], bool]):
+        """Returns the books of the feed pages, up to the first page without books. Usable books get their `catalog_date` and `chapters`
+        (the rows of the chapter table), or a catalog date of 0 and no chapters if their catalog page could not be loaded."""
+        return asyncio.run(self.crawl(feed_urls, is_book_useable))
+
+    async def crawl(self, feed_urls: List[str], is_book_useable: Callable[[dict], bool]):
+        semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        connector = aiohttp.TCPConnector(limit=self.max_concurrent_requests)
+        async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+            books = await self.crawl_feed(session, semaphore, feed_urls)
+            usable_books = [book for book in books if is_book_useable(book)]
+            known_books = self.books.load() if self.books is not None else {}
+            new_books = [book for book in usable_books if book['id'] not in known_books]
+            print(f"{len(usable_books)} usable books, {len(new_books)} of them are new since the last crawl.")
+            details = dict(known_books)
+            tasks = [self.crawl_book(session, semaphore, book) for book in new_books]
+            for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Getting catalog dates and chapters of new books"):
+                book_details = await task
+                if book_details is not None:
+                    details[book_details['id']] = book_details
+
+        for book in usable_books:
+            book_details = details.get(book['id'])
+            book['catalog_date'] = book_details['catalog_date'] if book_details is not None else 0
+            book['chapters'] = book_details['chapters'] if book_details is not None else None
+        return books
+
+    async def crawl_feed(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, feed_urls: List[str]):
+        """Returns the books of the feed pages up to the first page without books. The pages after it are not requested,
+        except for the ones in the same batch."""
+        books = []
+        for batch_start in range(0, len(feed_urls), self.feed_pages_per_batch):
+            batch_urls = feed_urls[batch_start:batch_start + self.feed_pages_per_batch]
+            pages = await asyncio.gather(*[self.fetch_or_none(session, semaphore, url) for url in batch_urls])
+            for url, page in zip(batch_urls, pages):
+                result = self.parse_feed_page(url, page)
+                if not result:
+                    print("Stopping download of overview metadata.")
+                    return books
+                books.extend(result)
+        return books
+
+    async def crawl_book(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, book: dict):
+        """Loads the catalog page of the book and records its details. Books whose page could not be loaded are not recorded and are tried again by the next crawl."""
+        page = await self.fetch_or_none(session, semaphore, book['url_librivox'])
+        if page is None:
+            return None
+        book_details = {'id': book['id'], 'catalog_date': self.parse_catalog_date(page), 'chapters': self.parse_chapters(page)}
+        if self.books is not None:
+            self.books.append(book_details)
+        return book_details
+
+    def parse_feed_page(self, url: str, page: str):
+        if page is None:
+            return None
+        try:
+            result = json.loads(page)
+        except ValueError as e:
+            print(f"Error in {url}: {e}")
+            return None
+        if 'books' not in result:
+            print(result)
+            return None
+        return result['books']
+
+    def parse_catalog_date(self, page: str):
+        soup = bs.BeautifulSoup(page, 'html.parser')
+        try:
+            production_details = soup.find("dl", class_="product-details")
+            catalog_date = production_details.find_all("dd")[2].text
+        except:
+            catalog_date = "0000-00-00" # placeholder as `oldest` book
+        return int(catalog_date.replace("-", ""))
+
+    def parse_chapters(self, page: str):
+        """Returns the rows of the first table of the page (the chapters) with None for empty cells, or None if the page has no table."""
+        try:
+            # lxml is the parser pandas uses by default, it is pinned in the requirements
+            chapters = pd.read_html(io.StringIO(page), flavor='lxml')[0]
+        except ValueError:
+            return None
+        chapters = chapters.astype(object).where(pd.notna(chapters), None)
+        return chapters.to_dict('records')
+
+    async def fetch_or_none(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, url: str):
+        try:
+            return await self.fetch(session, semaphore, url)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Unable to load {url}: {e!r}")
+            return None
+
+    async def fetch(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, url: str):
+        """Returns the text of the url. A cached response is revalidated with its ETag/Last-Modified and reused if the server answers 304."""
+        cached = self.load_response(url)
+        headers = {}
+        if cached is not None and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached is not None and cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with semaphore:
+                    async with session.get(url, headers=headers) as response:
+                        if response.status == 304 and cached is not None:
+                            return cached['text']
+                        if response.status in self.retry_statuses and attempt < self.max_retries:
+                            delay = self.get_retry_delay(response.headers.get('Retry-After'), attempt)
+                        else:
+                            response.raise_for_status()
+                            text = await response.text(encoding='UTF-8')
+                            self.save_response(url, text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+                            return text
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError):
+                if attempt == self.max_retries:
+                    raise
+                delay = self.get_retry_delay(None, attempt)
+            # the request slot is free while waiting
+            await asyncio.sleep(delay)
+
+    def get_retry_delay(self, retry_after: str, attempt: int):
+        if retry_after is not None and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff_seconds * 2 ** attempt * random.uniform(0.5, 1.5)
+
+    def get_response_path(self, url: str):
+        key = hashlib.sha256(url.encode('utf8')).hexdigest()
+        return os.path.join(self.cache_path, 'responses', key[:2], key + '.json')
+
+    def load_response(self, url: str) -> Dict[str, str]:
+        if self.cache_path is None:
+            return None
+        try:
+            with open(self.get_response_path(url), 'r', encoding='utf8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save_response(self, url: str, text: str, etag: str, last_modified: str):
+        """Only responses that can be revalidated are cached."""
+        if self.cache_path is None or (etag is None and last_modified is None):
+            return
+        response_path = self.get_response_path(url)
+        self.path_util.create_folder_for_file(response_path)
+        temporary_path = f'{response_path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'w', encoding='utf8') as f:
+            json.dump({'url': url, 'etag': etag, 'last_modified': last_modified, 'text': text}, f, ensure_ascii=False)
+        os.replace(temporary_path, response_path)
@@ -0,0 +1,123 @@
+import json
+import os
+import struct
+from typing import Dict, Tuple
+import numpy as np
+from natsort import natsorted
+from huiAudioCorpus.model.Audio import Audio
+from huiAudioCorpus.utils.FileListUtil import FileListUtil
+from huiAudioCorpus.utils.PathUtil import PathUtil
+
+shard_magic = b'HUISHRD1'
+# magic and the byte offset of the index
+shard_header = struct.Struct('<8sQ')
+shard_dtype = np.float32
+
+class ShardedAudioPersistence:
+    """Alternative to `AudioPersistence` that stores many clips in a few shard files instead of one WAV per clip.
+    A shard starts with a fixed header pointing to a JSON index at its end (ID -> sample offset, sample count, sampling rate),
+    followed by the raw float32 samples of its clips. Loaded clips are views into a memory map of the shard, so no samples are copied.
+    Written shards only become readable after `close`."""
+
+    def __init__(self, load_path: str, save_path: str = None, file_extension: str = 'shard', max_shard_bytes: int = 1024 ** 3):
+        self.save_path = load_path if save_path is None else save_path
+        self.load_path = load_path
+        self.file_extension = file_extension
+        self.max_shard_bytes = max_shard_bytes
+        self.file_list_util = FileListUtil()
+        self.path_util = PathUtil()
+        self.index: Dict[str, Tuple[str, int, int, int]] = None
+        self.memory_maps: Dict[str, np.memmap] = {}
+        self.index_offsets: Dict[str, int] = {}
+        self.shard_file = None
+        self.shard_entries: Dict[str, list] = {}
+
+    def get_shard_paths(self):
+        return natsorted(self.file_list_util.get_files(self.load_path, self.file_extension))
+
+    def load_index(self):
+        """Reads the indexes of all shards below `load_path`. IDs of shards in subfolders are prefixed with the subfolder."""
+        if self.index is not None:
+            return self.index
+        self.index = {}
+        for shard_path in self.get_shard_paths():
+            prefix = os.path.relpath(os.path.dirname(shard_path), self.load_path).replace(os.sep, '/')
+            prefix = '' if prefix == '.' else prefix + '/'
+            with open(shard_path, 'rb') as f:
+                magic, index_offset = shard_header.unpack(f.read(shard_header.size))
+                if magic != shard_magic or index_offset == 0:
+                    raise ValueError(f"{shard_path} is not a complete audio shard.")
+                f.seek(index_offset)
+                entries = json.loads(f.read().decode('utf8'))
+            self.index_offsets[shard_path] = index_offset
+            for audio_id, (offset, samples, sampling_rate) in entries.items():
+                self.index[prefix + audio_id] = (shard_path, offset, samples, sampling_rate)
+        return self.index
+
+    def get_memory_map(self, shard_path: str):
+        if shard_path not in self.memory_maps:
+            # the map ends before the index, whose length is not a multiple of the sample size
+            samples = self.index_offsets[shard_path] // np.dtype(shard_dtype).itemsize
+            self.memory_maps[shard_path] = np.memmap(shard_path, dtype=shard_dtype, mode='r', shape=(samples,))
+        return self.memory_maps[shard_path]
+
+    def get_ids(self):
+        return natsorted(self.load_index().keys())
+
+    def get_names(self):
+        return [self.path_util.filename_without_extension(audio_id) for audio_id in self.get_ids()]
+
+    def load(self, audio_id: str, duration=None, offset=0.0):
+        """Load a clip as an Audio object whose time series is a read-only view into the shard.
+        `duration` and `offset` in seconds behave like in `AudioPersistence.load`."""
+        shard_path, start, samples, sampling_rate = self.load_index()[audio_id]
+        # give duration higher priority than offset, like AudioPersistence
+        if offset > 0.0 and duration is not None and samples / sampling_rate - offset < duration:
+            offset = max(0, samples / sampling_rate - duration)
+        first_sample = min(samples, int(round(offset * sampling_rate)))
+        last_sample = samples if duration is None else min(samples, first_sample + int(round(duration * sampling_rate)))
+        time_series = self.get_memory_map(shard_path)[start + first_sample:start + last_sample]
+        name = self.path_util.filename_without_extension(audio_id)
+        return Audio(time_series, sampling_rate, audio_id, name)
+
+    def load_all(self, duration=None, offset=0.0):
+        for audio_id in self.get_ids():
+            yield self.load(audio_id, duration=duration, offset=offset)
+
+    def save(self, audio: Audio):
+        """Append an Audio object to the current shard, starting a new shard when it is full."""
+        samples = np.ascontiguousarray(audio.time_series, dtype=shard_dtype)
+        if self.shard_file is not None and self.shard_file.tell() + samples.nbytes > self.max_shard_bytes:
+            self.close()
+        if self.shard_file is None:
+            self.open_next_shard()
+        offset = self.shard_file.tell() // samples.itemsize
+        self.shard_file.write(samples.tobytes())
+        self.shard_entries[audio.id] = [offset, len(samples), audio.sampling_rate]
+
+    def open_next_shard(self):
+        shard_number = 0
+        while os.path.exists(self.get_shard_path(shard_number)):
+            shard_number += 1
+        target_path = self.get_shard_path(shard_number)
+        self.path_util.create_folder_for_file(target_path)
+        self.shard_file = open(target_path, 'wb')
+        self.shard_file.write(shard_header.pack(shard_magic, 0))
+        self.shard_entries = {}
+
+    def get_shard_path(self, shard_number: int):
+        return f'{self.save_path}/shard_{shard_number:05d}.{self.file_extension}'
+
+    def close(self):
+        """Write the index of the current shard and point the header to it."""
+        if self.shard_file is None:
+            return
+        index_offset = self.shard_file.tell()
+        self.shard_file.write(json.dumps(self.shard_entries, ensure_ascii=False).encode('utf8'))
+        self.shard_file.seek(0)
+        self.shard_file.write(shard_header.pack(shard_magic, index_offset))
+        self.shard_file.close()
+        self.shard_file = None
+        self.shard_entries = {}
+        # the new shard is picked up on the next read
+        self.index = None
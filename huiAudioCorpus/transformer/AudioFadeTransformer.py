@@ -10,6 +10,8 @@ class AudioFadeTransformer:
     def transform(self, audio: Audio):
         audio = self.fade_out(audio)
         audio = self.fade_in(audio)
+        # the samples were changed in place
+        audio.invalidate_features()
         return audio
         
 
@@ -7,8 +7,8 @@ class AudioLoudnessTransformer:
         self.loudness = loudness
 
     def transform(self, audio: Audio):
-        meter = pyln.Meter(audio.sampling_rate)  # create BS.1770 meter
-
         loudness_normalized_audio = pyln.normalize.loudness(audio.time_series, audio.loudness, self.loudness)
+        # the gain is a float64 scalar, which must not turn float32 audio into float64
+        loudness_normalized_audio = loudness_normalized_audio.astype(audio.time_series.dtype, copy=False)
         new_audio = Audio(loudness_normalized_audio, audio.sampling_rate, audio.id, audio.name)
         return new_audio
@@ -1,6 +1,8 @@
 from typing import List
 import librosa
+import numpy as np
 from huiAudioCorpus.model.Audio import Audio
+from huiAudioCorpus.model.AudioClip import AudioClip
 from huiAudioCorpus.transformer.AudioFadeTransformer import AudioFadeTransformer
 import statistics
 
@@ -13,34 +15,65 @@ class AudioSplitTransformer:
         self.audio_fade_transformer = audio_fade_transformer
 
     def transform(self, audio: Audio, book_name: str, chapter: int):
-        """Splits an Audio (i.e. one book chapter) into Audios within the min/max duration thresholds and assigns them IDs.
+        """Splits an Audio (i.e. one book chapter) into Audios within the min/max duration thresholds, assigns them IDs and fades them.
+        Returns the split Audios as a list."""
+        with_ids = self.split_into_clips(audio, book_name, chapter)
+        with_fading = self.fade(with_ids)
+        return with_fading
+
+    def split_into_clips(self, audio: Audio, book_name: str, chapter: int):
+        """Splits an Audio (i.e. one book chapter) into Audios within the min/max duration thresholds and assigns them IDs, without fading.
         Returns the split Audios as a list."""
         splitted = self.split_with_best_decibel(audio, self.max_audio_duration - self.min_audio_duration)
         splitted = self.merge_audio_to_target_duration(splitted, self.min_audio_duration)
         merged = self.merge_last_audio_if_too_short(splitted, self.min_audio_duration)
-        with_ids = self.set_ids(merged, book_name, chapter)
-        with_fading = self.fade(with_ids)
-        return with_ids
+        return self.set_ids(merged, book_name, chapter)
 
     def split_with_best_decibel(self, audio: Audio, max_audio_duration: float):
         """Determine the highest-possible db threshold for getting audio splits that stay below the maximum audio duration.
+        The dB envelope of the audio is computed once and reused for every threshold, and only the splits of the chosen threshold are cut out.
+        The thresholds are scanned from the highest down, because the longest split does not shrink monotonically with the threshold.
         Returns list of non-silent Audio splits below the maximum audio duration."""
-        splitted_audio: List[Audio] = []
-        max_duration: float = 0
+        db_envelope = self.get_db_envelope(audio)
+        intervals: List = []
         for silence_decibel in range(70, -20, -5):
-            splitted_audio = self.split(audio, silence_decibel)
-            max_duration = max([audio.duration for audio in splitted_audio])
+            intervals = self.get_split_intervals(audio, db_envelope, silence_decibel)
+            max_duration = max([end - start for start, end in intervals]) / audio.sampling_rate
             if max_duration < max_audio_duration:
                 print(audio.name, 'used DB:', silence_decibel)
-                return splitted_audio
-        return splitted_audio
+                return self.cut(audio, intervals)
+        return self.cut(audio, intervals)
 
     def split(self, audio: Audio, silence_decibel: int):
         """Splits an Audio instance into non-silent intervals, based on a threshold `silence_decibel`. 
         Returns list of non-silent Audio splits derived from the input Audio."""
+        intervals = self.get_split_intervals(audio, self.get_db_envelope(audio), silence_decibel)
+        return self.cut(audio, intervals)
+
+    def get_frame_parameters(self, audio: Audio):
         frame_length = int(self.silence_duration_in_seconds * audio.sampling_rate)
-        splitted = librosa.effects.split(y=audio.time_series, top_db=silence_decibel, frame_length=frame_length, hop_length=int(frame_length/4))
-        audios = []
+        return frame_length, int(frame_length/4)
+
+    def get_db_envelope(self, audio: Audio):
+        """Frame-wise RMS in dB relative to the loudest frame, computed the same way as `librosa.effects.split` does."""
+        frame_length, hop_length = self.get_frame_parameters(audio)
+        rms = librosa.feature.rms(y=audio.time_series, frame_length=frame_length, hop_length=hop_length)
+        return librosa.amplitude_to_db(rms[0], ref=np.max, top_db=None)
+
+    def get_split_intervals(self, audio: Audio, db_envelope: np.ndarray, silence_decibel: int):
+        """Returns the sample intervals of the splits for one threshold. The non-silent intervals are derived from the envelope
+        like `librosa.effects.split` does, and then the boundaries between neighbouring intervals are moved to the middle of the silence."""
+        _, hop_length = self.get_frame_parameters(audio)
+        non_silent = db_envelope > -silence_decibel
+        edges = [np.flatnonzero(np.diff(non_silent.astype(int))) + 1]
+        if non_silent[0]:
+            edges.insert(0, np.array([0]))
+        if non_silent[-1]:
+            edges.append(np.array([len(non_silent)]))
+        edges = librosa.frames_to_samples(np.concatenate(edges), hop_length=hop_length)
+        splitted = np.minimum(edges, audio.samples).reshape((-1, 2))
+
+        intervals = []
         for i in range(len(splitted)):
             (start, end) = splitted[i]
             is_next_element_available = len(splitted) > i + 1
@@ -56,13 +89,16 @@ class AudioSplitTransformer:
                 better_start = int(statistics.mean([previous_end, start]))
             else:
                 better_start = start
+            intervals.append((better_start, better_end))
+        return intervals
 
-            new_audio = Audio(audio.time_series[better_start:better_end], audio.sampling_rate, 'id', 'name')
-            audios.append(new_audio)
-        return audios
+    def cut(self, audio: Audio, intervals: List):
+        """Returns the intervals as clips that refer to the samples of the audio, so merging neighbouring clips later copies no samples."""
+        return [AudioClip(audio, start, end, 'id', 'name') for start, end in intervals]
 
     def merge_audio_to_target_duration(self, audios: List[Audio], target_duration: float):
         """Merges (concatenates) Audios to get audios which meet the minimum duration requirement.
+        Neighbouring clips of the same chapter are merged into one clip covering both sample ranges.
         Returns the list of concatenated audios."""
         merged_audios: List[Audio] = []
 
@@ -1,22 +1,53 @@
 from huiAudioCorpus.model.Sentence import Sentence
+from huiAudioCorpus.model.SentenceSpan import SentenceSpan
+from typing import Union
+from math import inf
 from Levenshtein import distance as levenshtein_distance
 
 class SentenceDistanceTransformer:
 
-    def transform(self, sentence1: Sentence, sentence2: Sentence):
+    def transform(self, sentence1: Union[Sentence, SentenceSpan], sentence2: Union[Sentence, SentenceSpan]):
         """Calculate the base distance between two sentences."""
         base_distance = self.distance_two_sentences(sentence1, sentence2)
         return base_distance
 
   
-    def distance_two_sentences(self, sentence1: Sentence, sentence2: Sentence):
+    def transform_span(self, source: Sentence, start: int, end: int, sentence: Union[Sentence, SentenceSpan]):
+        """Calculate the base distance between the words [start, end) of a source text and a sentence, without building a span."""
+        if end <= start or sentence.words_count == 0:
+            return 1
+        return self.distance_two_strings(source.raw_chars_span(start, end), sentence.raw_chars)
+
+    def transform_span_bounded(self, source: Sentence, start: int, end: int, sentence: Union[Sentence, SentenceSpan], upper_bound: float):
+        """
+        Calculate the base distance between the words [start, end) of a source text and a sentence, if it is below an upper bound.
+        Spans whose length difference alone reaches the bound are skipped, and the Levenshtein computation stops as soon as the bound can't be beaten.
+
+        Returns:
+            float: the distance if it is below `upper_bound`, otherwise `upper_bound`
+        """
+        # words outside of the source are ignored, like in `raw_chars_span`
+        start, end, _ = slice(start, end).indices(source.words_count)
+        if end <= start or sentence.words_count == 0:
+            return min(1, upper_bound)
+        count_chars_source = source.char_offsets[end] - source.char_offsets[start]
+        count_chars_sentence = len(sentence.raw_chars)
+        count_chars_max = max(count_chars_source, count_chars_sentence)
+        if abs(count_chars_source - count_chars_sentence) / count_chars_max >= upper_bound:
+            return upper_bound
+        # the cutoff has a slack of one edit to be safe against rounding, the exact comparison is done on the normalized distance
+        score_cutoff = None if upper_bound == inf else int(upper_bound * count_chars_max) + 1
+        diff = levenshtein_distance(source.raw_chars_span(start, end), sentence.raw_chars, score_cutoff=score_cutoff)
+        distance = diff / count_chars_max
+        return min(distance, upper_bound)
+
+    def distance_two_sentences(self, sentence1: Union[Sentence, SentenceSpan], sentence2: Union[Sentence, SentenceSpan]):
         if sentence1.words_count == 0 or sentence2.words_count == 0:
             return 1
-        
-        # concatenate words in each sentence to form strings without punctuation
-        sentence_string1 = "".join(sentence1.words_without_punct)
-        sentence_string2 = "".join(sentence2.words_without_punct)
+        # `raw_chars` are the words of each sentence concatenated to strings without punctuation
+        return self.distance_two_strings(sentence1.raw_chars, sentence2.raw_chars)
 
+    def distance_two_strings(self, sentence_string1: str, sentence_string2: str):
         # determine the maximum length of the two sentence strings
         count_chars_max = max(len(sentence_string1), len(sentence_string2))
         # calculate the Levenshtein distance between the two sentence strings
@@ -0,0 +1,99 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Tuple
+import os
+import re
+import requests
+from requests.adapters import HTTPAdapter
+from tqdm import tqdm
+from urllib3.util.retry import Retry
+from huiAudioCorpus.utils.PathUtil import PathUtil
+
+class DownloadManager:
+    """Downloads files over a pooled session with a bounded number of connections.
+    A file is written to `<file>.part` and renamed once its size matches the size announced by the server,
+    so an interrupted download never leaves a truncated file behind and is resumed with an HTTP range request."""
+    part_extension = '.part'
+
+    def __init__(self, number_of_connections: int = 4, chunk_size: int = 1024 * 1024, timeout: float = 60, max_retries: int = 3):
+        """
+        Params:
+            number_of_connections: number of files downloaded at the same time, which is also the size of the connection pool
+            timeout: seconds to wait for the connection and for each chunk
+            max_retries: attempts per file after a broken connection or a size mismatch, each attempt resumes the part file
+        """
+        self.number_of_connections = number_of_connections
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.path_util = PathUtil()
+        self.session = requests.Session()
+        retry = Retry(total=max_retries, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=['GET', 'HEAD'])
+        adapter = HTTPAdapter(pool_connections=number_of_connections, pool_maxsize=number_of_connections, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def download_all(self, downloads: List[Tuple[str, str]]):
+        """Downloads the (url, output file) pairs and returns the output files. Files that already exist are skipped."""
+        with ThreadPoolExecutor(max_workers=self.number_of_connections) as executor:
+            futures = [executor.submit(self.download, url, output_file) for url, output_file in downloads]
+            for future in tqdm(as_completed(futures), total=len(futures), desc='Downloading files'):
+                future.result()
+        return [output_file for _, output_file in downloads]
+
+    def download(self, url: str, output_file: str):
+        if os.path.isfile(output_file):
+            return output_file
+        self.path_util.create_folder_for_file(output_file)
+        part_file = output_file + self.part_extension
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.download_part(url, part_file)
+                break
+            except requests.HTTPError:
+                # an error status (e.g. 404) does not change by resuming, retries for temporary ones are done by the session
+                raise
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError, IOError) as e:
+                if attempt == self.max_retries:
+                    raise
+                print(f'Resuming the download of {url} after: {e}')
+        os.replace(part_file, output_file)
+        return output_file
+
+    def download_part(self, url: str, part_file: str):
+        """Appends the missing bytes of the file to the part file. Raises an IOError if the part file does not have the announced size afterwards."""
+        offset = os.path.getsize(part_file) if os.path.isfile(part_file) else 0
+        headers = {'Range': f'bytes={offset}-'} if offset > 0 else {}
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 416:
+                # the part file already has all bytes, or more than the file on the server
+                total_size = self.get_total_size(response)
+                if total_size == offset:
+                    return
+                os.unlink(part_file)
+                raise IOError(f'The part file of {url} is larger than the file on the server.')
+            response.raise_for_status()
+            if response.status_code == 206:
+                total_size = self.get_total_size(response)
+                start = int(re.match(r'bytes (\d+)-', response.headers['Content-Range']).group(1))  # type: ignore
+                if start != offset:
+                    raise IOError(f'The server returned the range of {url} from byte {start} instead of {offset}.')
+                mode = 'ab'
+            else:
+                # the server does not support ranges, so the file is downloaded from the beginning
+                content_length = response.headers.get('Content-Length')
+                total_size = int(content_length) if content_length is not None else None
+                offset = 0
+                mode = 'wb'
+            with open(part_file, mode) as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+        size = os.path.getsize(part_file)
+        if total_size is not None and size != total_size:
+            raise IOError(f'The download of {url} has {size} bytes instead of {total_size}.')
+
+    def get_total_size(self, response: requests.Response):
+        content_range = response.headers.get('Content-Range', '')
+        match = re.match(r'bytes (?:\d+-\d+|\*)/(\d+)', content_range)
+        return int(match.group(1)) if match is not None else None
@@ -0,0 +1,58 @@
+import json
+import os
+from typing import Dict, List
+from huiAudioCorpus.utils.PathUtil import PathUtil
+
+class JsonlJournal:
+    """Append-only file with one JSON record per line. Every record is flushed to disk when it is appended,
+    so the records survive a crash and an interrupted step can continue with the items that are still missing."""
+
+    def __init__(self, path: str, key: str = 'id'):
+        self.path = path
+        self.key = key
+        self.path_util = PathUtil()
+
+    def load(self) -> Dict[str, dict]:
+        """Load all records, indexed by their key. A later record replaces an earlier one with the same key,
+        and an incomplete last line (from a crash during writing) is ignored."""
+        records = {}
+        if not os.path.isfile(self.path):
+            return records
+        with open(self.path, 'r', encoding='utf8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                records[record[self.key]] = record
+        return records
+
+    def append(self, record: dict):
+        self.append_all([record])
+
+    def append_all(self, records: List[dict]):
+        self.path_util.create_folder_for_file(self.path)
+        # a crash may have left an incomplete line, which must not be continued by the next record
+        needs_newline = os.path.isfile(self.path) and os.path.getsize(self.path) > 0 and not self.ends_with_newline()
+        with open(self.path, 'a', encoding='utf8') as f:
+            if needs_newline:
+                f.write('\n')
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, default=self.to_json) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def to_json(self, value):
+        # numpy scalars, e.g. computed audio features
+        if hasattr(value, 'item'):
+            return value.item()
+        raise TypeError(f"{type(value).__name__} can not be written to the journal.")
+
+    def ends_with_newline(self):
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def remove(self):
+        if os.path.isfile(self.path):
+            os.unlink(self.path)
@@ -0,0 +1,132 @@
+import hashlib
+import inspect
+import json
+import os
+from typing import List
+from huiAudioCorpus.enum.PipelineReturnEnum import PipelineReturnEnum
+from huiAudioCorpus.utils.DoneMarker import DoneMarker
+from huiAudioCorpus.utils.JsonlJournal import JsonlJournal
+from huiAudioCorpus.utils.PathUtil import PathUtil
+
+class StepCache:
+    """Done marker that also records what a step was run with: a fingerprint of its input files, of its configuration
+    (the settings of the step and the components injected into it) and of the source code of these classes.
+    A done step is only run again if the fingerprint changed. A step that was interrupted with the same fingerprint is resumed:
+    its folder is kept and the items recorded in `items` can be skipped.
+    A step keeps its cache in the attribute `step_cache`, which is not part of the configuration."""
+    fingerprint_filename = '.fingerprint.json'
+    items_filename = '.items.jsonl'
+
+    def __init__(self, path: str, step, inputs: List[str] = [], ignored_attributes: List[str] = [], hash_inputs: bool = False):
+        """
+        Params:
+            path: folder of the step
+            step: the step instance, whose attributes form the configuration
+            inputs: files and folders the step reads
+            ignored_attributes: attributes of the step or its components that do not change the result (e.g. the number of workers)
+            hash_inputs: hash the content of the input files instead of using their size and modification time
+        """
+        self.path = path
+        self.step = step
+        self.inputs = inputs
+        self.ignored_attributes = ignored_attributes
+        self.hash_inputs = hash_inputs
+        self.done_marker = DoneMarker(path)
+        self.items = JsonlJournal(os.path.join(path, self.items_filename))
+        self.fingerprint_path = os.path.join(path, self.fingerprint_filename)
+        self.path_util = PathUtil()
+
+    def run(self, script, delete_folder=True):
+        fingerprint = self.get_fingerprint()
+        stored_fingerprint = self.load_fingerprint()
+        if self.done_marker.is_done():
+            if stored_fingerprint is None:
+                # done before the step cache existed, the current state is taken as the state it was run with
+                self.save_fingerprint(fingerprint)
+                print(self.done_marker.get_info())
+                return PipelineReturnEnum.OkWithDoneMarker
+            if stored_fingerprint == fingerprint:
+                print(self.done_marker.get_info())
+                return PipelineReturnEnum.OkWithDoneMarker
+            changed = [part for part in fingerprint if stored_fingerprint.get(part) != fingerprint[part]]
+            print(f"Running the step again because its {', '.join(changed)} changed.")
+        elif stored_fingerprint == fingerprint:
+            print(f"Resuming the step, {len(self.items.load())} items are already done.")
+            script()
+            self.done_marker.set_done()
+            return PipelineReturnEnum.Ok
+
+        if delete_folder:
+            self.path_util.delete_folder(self.path)
+        else:
+            self.done_marker.remove()
+            self.items.remove()
+        self.save_fingerprint(fingerprint)
+
+        script()
+
+        self.done_marker.set_done()
+        return PipelineReturnEnum.Ok
+
+    def load_fingerprint(self):
+        if not os.path.isfile(self.fingerprint_path):
+            return None
+        with open(self.fingerprint_path, 'r', encoding='utf8') as f:
+            return json.load(f)
+
+    def save_fingerprint(self, fingerprint: dict):
+        self.path_util.create_folder_for_file(self.fingerprint_path)
+        with open(self.fingerprint_path, 'w', encoding='utf8') as f:
+            json.dump(fingerprint, f, indent=1)
+
+    def get_fingerprint(self):
+        code_files = set()
+        config = self.describe(self.step, code_files, self.ignored_attributes + ['step_cache'])
+        return {
+            'inputs': self.hash_text(json.dumps(self.describe_inputs(), sort_keys=True)),
+            'config': self.hash_text(json.dumps(config, sort_keys=True)),
+            'code': self.hash_text(''.join(self.hash_file(file) for file in sorted(code_files)))
+        }
+
+    def describe_inputs(self):
+        """Lists every input file with its size and modification time, or with its content hash if `hash_inputs` is set.
+        Hidden files (e.g. done markers) are left out."""
+        files = []
+        for input_path in self.inputs:
+            if os.path.isfile(input_path):
+                files.append(input_path)
+                continue
+            for folder, folders, file_names in os.walk(input_path):
+                folders[:] = sorted(folder_name for folder_name in folders if not folder_name.startswith('.'))
+                files.extend(os.path.join(folder, file_name) for file_name in sorted(file_names) if not file_name.startswith('.'))
+        if self.hash_inputs:
+            return [[file, self.hash_file(file)] for file in files]
+        return [[file, os.stat(file).st_size, os.stat(file).st_mtime_ns] for file in files]
+
+    def describe(self, value, code_files: set, ignored_attributes: List[str] = [], depth: int = 0):
+        """Turns a value into JSON data. Objects of this package are described by their attributes, and their source files are collected
+        for the code fingerprint. Other objects (e.g. loaded models) are only described by their type."""
+        if value is None or isinstance(value, (str, int, float, bool)):
+            return value
+        if isinstance(value, dict):
+            return {str(key): self.describe(item, code_files, ignored_attributes, depth) for key, item in value.items() if key not in ignored_attributes}
+        if isinstance(value, (list, tuple, set)):
+            items = [self.describe(item, code_files, ignored_attributes, depth) for item in value]
+            return sorted(items, key=json.dumps) if isinstance(value, set) else items
+        if callable(value) and hasattr(value, '__qualname__'):
+            return getattr(value, '__module__', '') + '.' + value.__qualname__
+        value_type = type(value)
+        if not value_type.__module__.startswith('huiAudioCorpus') or depth > 3:
+            return value_type.__module__ + '.' + value_type.__qualname__
+        code_files.add(inspect.getsourcefile(value_type))
+        return {'type': value_type.__qualname__, 'attributes': self.describe(vars(value), code_files, ignored_attributes, depth + 1)}
+
+    def hash_text(self, text: str):
+        return hashlib.sha256(text.encode('utf8')).hexdigest()
+
+    def hash_file(self, file: str):
+        hash = hashlib.sha256()
+        with open(file, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                hash.update(block)
+        return hash.hexdigest()
@@ -0,0 +1,58 @@
+from threading import Lock
+from typing import Dict, Tuple
+import torch
+import whisper
+
+compute_types = ['float32', 'float16']
+
+class WhisperModelRegistry:
+    """Process-wide store of loaded Whisper models, keyed by (model name or checkpoint path, device, compute type).
+    Every `DependencyInjection` creates a new converter, so the models are kept here instead of on the converter
+    to load the weights only once per process."""
+    models: Dict[Tuple[str, str, str], whisper.Whisper] = {}
+    lock = Lock()
+
+    @classmethod
+    def resolve_key(cls, model_name: str, device: str = None, compute_type: str = None):
+        """Returns the registry key with the defaults filled in: CUDA if available and float16 on GPUs, float32 on the CPU."""
+        if device is None:
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        if compute_type is None:
+            compute_type = 'float32' if device == 'cpu' else 'float16'
+        if compute_type not in compute_types:
+            raise ValueError(f"Compute type {compute_type} is not supported, choose one of {compute_types}.")
+        if compute_type == 'float16' and device == 'cpu':
+            raise ValueError("Compute type float16 is not supported on the CPU.")
+        return model_name, device, compute_type
+
+    @classmethod
+    def get(cls, model_name: str, device: str = None, compute_type: str = None):
+        """Returns the model for the given key and loads it on first use.
+        Params:
+            model_name: a Whisper model name (e.g. "small") or the path of a local checkpoint
+            device: torch device, defaults to CUDA if available
+            compute_type: "float32" or "float16", defaults to float16 on GPUs
+        """
+        key = cls.resolve_key(model_name, device, compute_type)
+        with cls.lock:
+            if key not in cls.models:
+                print(f"Loading Whisper model {key[0]} on {key[1]} with {key[2]}")
+                # Whisper keeps float32 weights and runs float16 through the `fp16` decoding option
+                cls.models[key] = whisper.load_model(key[0], device=key[1])
+            return cls.models[key]
+
+    @classmethod
+    def warm_up(cls, model_name: str, device: str = None, compute_type: str = None):
+        """Loads the model ahead of the first transcription, e.g. before a multi-book run."""
+        cls.get(model_name, device, compute_type)
+
+    @classmethod
+    def evict(cls, model_name: str = None, device: str = None, compute_type: str = None):
+        """Removes the given model from the registry, or all models if no name is given, and frees the GPU memory they used."""
+        with cls.lock:
+            if model_name is None:
+                cls.models.clear()
+            else:
+                cls.models.pop(cls.resolve_key(model_name, device, compute_type), None)
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
@@ -0,0 +1,208 @@
+"""
+Copyright 2024 Lyonel Behringer
+
+This file is based on code from https://github.com/iisys-hof/HUI-Audio-Corpus-German
+and is licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List
+import time
+import traceback
+
+
+class WorkflowTask:
+    def __init__(self, name: str, run: Callable, dependencies: List[str], resources: List[str], group: str, main_thread: bool):
+        self.name = name
+        self.run = run
+        self.dependencies = dependencies
+        self.resources = resources
+        self.group = group
+        self.main_thread = main_thread
+        self.status = 'pending'
+        self.start = None
+        self.end = None
+        self.error = None
+
+    def get_duration(self):
+        return self.end - self.start
+
+
+class WorkflowScheduler:
+    """Runs the steps of the workflow as a dependency graph: a step starts as soon as the steps it depends on are finished
+    and a unit of each resource it needs (e.g. network, cpu, asr, disk) is free. Steps of different books and independent steps of the
+    same book run at the same time in a thread pool, the heavy work of the steps already runs in their own process pools."""
+
+    def __init__(self, resource_limits: Dict[str, int], max_workers: int = 4, continue_on_error: bool = False):
+        """
+        Params:
+            resource_limits: number of steps that may use a resource at the same time
+            max_workers: number of steps that may run at the same time
+            continue_on_error: keep running the steps that do not depend on a failed step, otherwise no new step is started after an error
+        """
+        self.resource_limits = resource_limits
+        self.max_workers = max_workers
+        self.continue_on_error = continue_on_error
+        self.tasks: Dict[str, WorkflowTask] = {}
+
+    def add(self, name: str, run: Callable, dependencies: List[str] = [], resources: List[str] = [], group: str = '', main_thread: bool = False):
+        """Adds a step. Its dependencies have to be added before, so the graph cannot contain cycles.
+        Params:
+            run: function that runs the step
+            group: name the step is reported under, e.g. the book
+            main_thread: run the step in the thread that called `run`, e.g. because it shows plots. No other step is started while it runs,
+                so it is only run once every other ready step was started
+        """
+        if name in self.tasks:
+            raise Exception(f'The task {name} was already added.')
+        for dependency in dependencies:
+            if dependency not in self.tasks:
+                raise Exception(f'The task {name} depends on the unknown task {dependency}.')
+        for resource in resources:
+            if self.resource_limits.get(resource, 0) < 1:
+                raise Exception(f'The task {name} uses the resource {resource}, which has no limit of at least 1.')
+        self.tasks[name] = WorkflowTask(name, run, list(dependencies), list(resources), group, main_thread)
+        return name
+
+    def has(self, name: str):
+        return name in self.tasks
+
+    def run(self):
+        """Runs all steps and returns the status of every step: finished, error or skipped (a step it depends on failed).
+        Without `continue_on_error`, the first error is raised after the running steps are finished."""
+        priorities = self.get_priorities()
+        resources_in_use = {resource: 0 for resource in self.resource_limits}
+        running: Dict[Future, WorkflowTask] = {}
+        stopped = False
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                self.skip_failed_dependents()
+                ran_in_main_thread = False
+                if not stopped:
+                    main_thread_task = None
+                    for task in sorted(self.get_ready_tasks(), key=lambda task: -priorities[task.name]):
+                        if not self.has_free_resources(task, resources_in_use):
+                            continue
+                        if task.main_thread:
+                            main_thread_task = main_thread_task or task
+                            continue
+                        if len(running) >= self.max_workers:
+                            continue
+                        self.acquire_resources(task, resources_in_use)
+                        task.status = 'running'
+                        running[executor.submit(self.execute, task)] = task
+                    # no step can be started while a step runs in this thread, so it only runs after every other ready step was started
+                    if main_thread_task is not None and self.has_free_resources(main_thread_task, resources_in_use):
+                        self.acquire_resources(main_thread_task, resources_in_use)
+                        self.execute(main_thread_task)
+                        self.release_resources(main_thread_task, resources_in_use)
+                        stopped = main_thread_task.status == 'error' and not self.continue_on_error
+                        ran_in_main_thread = True
+                if ran_in_main_thread:
+                    # the steps started by the pool in the meantime are collected in the next pass
+                    done = [future for future in running if future.done()]
+                elif len(running) == 0:
+                    break
+                else:
+                    # every step that could be started is running, the others wait for a free worker or resource
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    self.release_resources(task, resources_in_use)
+                    if task.status == 'error' and not self.continue_on_error:
+                        stopped = True
+
+        failed = [task for task in self.tasks.values() if task.status == 'error']
+        if len(failed) > 0 and not self.continue_on_error:
+            raise failed[0].error
+        return {task.name: task.status for task in self.tasks.values()}
+
+    def has_free_resources(self, task: WorkflowTask, resources_in_use: Dict[str, int]):
+        return all(resources_in_use[resource] < self.resource_limits[resource] for resource in task.resources)
+
+    def acquire_resources(self, task: WorkflowTask, resources_in_use: Dict[str, int]):
+        for resource in task.resources:
+            resources_in_use[resource] += 1
+
+    def release_resources(self, task: WorkflowTask, resources_in_use: Dict[str, int]):
+        for resource in task.resources:
+            resources_in_use[resource] -= 1
+
+    def execute(self, task: WorkflowTask):
+        task.status = 'running'
+        task.start = time.perf_counter()
+        try:
+            task.run()
+            task.status = 'finished'
+        except Exception as e:
+            traceback.print_exc()
+            task.error = e
+            task.status = 'error'
+        task.end = time.perf_counter()
+
+    def get_ready_tasks(self):
+        return [task for task in self.tasks.values()
+                if task.status == 'pending' and all(self.tasks[dependency].status == 'finished' for dependency in task.dependencies)]
+
+    def skip_failed_dependents(self):
+        """Marks the steps that can no longer run because a step they depend on failed or was skipped. The tasks are stored in the order they were added,
+        so one pass reaches all dependents."""
+        for task in self.tasks.values():
+            if task.status == 'pending' and any(self.tasks[dependency].status in ['error', 'skipped'] for dependency in task.dependencies):
+                task.status = 'skipped'
+
+    def get_priorities(self):
+        """Number of steps on the longest chain that starts at a step. Ready steps with the longest chains are started first,
+        because they are the most likely to end up on the critical path."""
+        priorities = {}
+        for task in reversed(list(self.tasks.values())):
+            dependents = [other for other in self.tasks.values() if task.name in other.dependencies]
+            priorities[task.name] = 1 + max([priorities[dependent.name] for dependent in dependents], default=0)
+        return priorities
+
+    def get_critical_path(self, group: str):
+        """Follows the last finished step of the group back through the dependency that finished last before it started.
+        Returns the steps of the path and the seconds each of them waited for a free worker or resource after its dependencies were done."""
+        tasks = [task for task in self.tasks.values() if task.group == group and task.end is not None]
+        if len(tasks) == 0:
+            return []
+        path = []
+        task = max(tasks, key=lambda task: task.end)
+        while task is not None:
+            finished_dependencies = [self.tasks[dependency] for dependency in task.dependencies if self.tasks[dependency].end is not None]
+            blocking = max(finished_dependencies, key=lambda dependency: dependency.end, default=None)
+            ready_time = blocking.end if blocking is not None else self.get_run_start()
+            path.append((task, max(0.0, task.start - ready_time)))
+            task = blocking
+        return list(reversed(path))
+
+    def get_run_start(self):
+        return min(task.start for task in self.tasks.values() if task.start is not None)
+
+    def print_critical_path_report(self):
+        groups = []
+        for task in self.tasks.values():
+            if task.group not in groups:
+                groups.append(task.group)
+        run_start = self.get_run_start() if any(task.start is not None for task in self.tasks.values()) else 0.0
+        for group in groups:
+            path = self.get_critical_path(group)
+            if len(path) == 0:
+                continue
+            tasks = [task for task in self.tasks.values() if task.group == group and task.end is not None]
+            end = max(task.end for task in tasks)
+            busy = sum(task.get_duration() for task in tasks)
+            print(f'{group or "workflow"}: finished after {end - run_start:.1f} s, {busy:.1f} s of step time')
+            print('  critical path:')
+            for task, waited in path:
+                print(f'    {task.name:40s} {task.get_duration():8.1f} s   waited {waited:6.1f} s   {task.status}')
@@ -21,6 +21,7 @@ from huiAudioCorpus.utils.DoneMarker import DoneMarker
 from huiAudioCorpus.utils.whisper_utils import get_language_code, get_language_expanded
 from tqdm import tqdm
 import os
+import pandas as pd
 
 class Step0_Overview:
 
@@ -111,7 +112,7 @@ class Step0_Overview:
 
             for book in books_librivox:
                 if is_book_useable(book, self.language):
-                    book_metadata = {'time': book['totaltimesecs'], 'title':book['title'], 'url': book['url_text_source'], 'catalog_date': book['catalog_date']}
+                    book_metadata = {'time': book['totaltimesecs'], 'title':book['title'], 'url': book['url_text_source'], 'catalog_date': book['catalog_date'], 'chapters': book.get('chapters')}
                     # retrieve books with gutenberg-hosted texts
                     if self.text_hosted_by_gutenberg(book):
                         gutenberg_books.append(book_metadata)
@@ -125,9 +126,9 @@ class Step0_Overview:
             # write gutenberg-hosted books to file
             print("Processing books with Gutenberg-hosted texts.")
             remove_indices = []
-            illegal_readers = set(None, "Group", "NaN", "")
+            illegal_readers = {None, "Group", "NaN", ""}
             for i, book in tqdm(enumerate(gutenberg_books)):
-                chapters, _ = self.audios_from_librivox_persistence.get_chapters(book['title'], get_download_links=False)
+                chapters = self.get_chapter_table(book)
                 if chapters is None:
                     print(f"Unable to extract chapters for {book['title']} - removing from usable books.")
                     remove_indices.append(i)
@@ -150,8 +151,8 @@ class Step0_Overview:
             if not only_use_gutenberg_books:
                 print("Processing books with texts from other hosts.")
                 remove_indices = []
-                for book in tqdm(non_gutenberg_books):
-                    chapters, _ = self.audios_from_librivox_persistence.get_chapters(book['title'], get_download_links=False)
+                for i, book in tqdm(enumerate(non_gutenberg_books)):
+                    chapters = self.get_chapter_table(book)
                     if chapters is None:
                         print(f"Unable to extract chapters for {book['title']} - removing from usable books.")
                         remove_indices.append(i)
@@ -179,6 +180,13 @@ class Step0_Overview:
                 
         return {"gutenberg_books": gutenberg_books, "non_gutenberg_books": non_gutenberg_books}
 
+    def get_chapter_table(self, book):
+        """Returns the chapter table of the book from the crawl of the overview, or looks it up if the crawl could not load it."""
+        if book.get('chapters') is not None:
+            return pd.DataFrame(book['chapters'])
+        chapters, _ = self.audios_from_librivox_persistence.get_chapters(book['title'], get_download_links=False)
+        return chapters
+
     def text_hosted_by_gutenberg(self, book):
         """Determines whether or not the text of a book is hosted by a Gutenberg website.
         Returns a boolean."""
@@ -16,7 +16,7 @@ limitations under the License.
 """
 
 from huiAudioCorpus.persistence.AudiosFromLibrivoxPersistence import AudiosFromLibrivoxPersistence
-from huiAudioCorpus.utils.DoneMarker import DoneMarker
+from huiAudioCorpus.utils.StepCache import StepCache
 
 
 class Step1_DownloadAudio:
@@ -26,7 +26,9 @@ class Step1_DownloadAudio:
         self.audios_from_librivox_persistence = audios_from_librivox_persistence
 
     def run(self):
-        return DoneMarker(self.save_path).run(self.script)
+        # an interrupted download keeps its finished chapters and part files, unless the book or the chapters changed
+        self.step_cache = StepCache(self.save_path, self, ignored_attributes=['download_manager', 'start_timestamp'])
+        return self.step_cache.run(self.script)
     
     def script(self):
         self.audios_from_librivox_persistence.save()
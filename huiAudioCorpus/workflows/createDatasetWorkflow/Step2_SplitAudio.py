@@ -15,13 +15,30 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
-from typing import List
+from typing import Dict, List, Tuple
 from huiAudioCorpus.persistence.AudioPersistence import AudioPersistence
+from huiAudioCorpus.persistence.AudioFeaturePersistence import AudioFeaturePersistence
+from huiAudioCorpus.components.AudioStatisticComponent import AudioStatisticComponent
 from huiAudioCorpus.transformer.AudioSplitTransformer import AudioSplitTransformer
 from huiAudioCorpus.transformer.AudioLoudnessTransformer import AudioLoudnessTransformer
 from huiAudioCorpus.model.Audio import Audio
-from huiAudioCorpus.utils.DoneMarker import DoneMarker
-from joblib import Parallel, delayed
+from huiAudioCorpus.utils.StepCache import StepCache
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import multiprocessing
+from queue import Queue
+from threading import Thread
+import time
+
+pipeline_stages = ['decode', 'split', 'fade', 'loudness', 'features', 'write']
+
+split_worker_state = {}
+
+def init_split_worker(step: 'Step2_SplitAudio'):
+    """Store the step in the worker process, so it is only sent once per worker."""
+    split_worker_state['step'] = step
+
+def split_chapter_in_worker(audio_id: str, chapter: int):
+    return split_worker_state['step'].split_chapter(audio_id, chapter)
 
 class Step2_SplitAudio:
 
@@ -33,7 +50,20 @@ class Step2_SplitAudio:
                  solo_reading: bool, 
                  sections: list, 
                  audio_loudness_transformer: AudioLoudnessTransformer, 
-                 remap_sort: List[int] = None):
+                 audio_statistic_component: AudioStatisticComponent,
+                 audio_feature_persistence: AudioFeaturePersistence,
+                 remap_sort: List[int] = None,
+                 number_of_workers: int = 1,
+                 max_chapters_in_flight: int = None,
+                 write_queue_size: int = 64,
+                 write_features: bool = True):
+        """
+        Params:
+            number_of_workers: processes that decode, split, fade and loudness-normalize chapters; 1 processes them in this process
+            max_chapters_in_flight: chapters that are processed or waiting to be written at the same time, bounds the memory use (default: 2 per worker)
+            write_queue_size: clips that may wait for the background writer
+            write_features: store the statistic features of the clips in a sidecar next to them, so the statistics need not decode the clips again
+        """
         self.audio_persistence = audio_persistence
         self.save_path = save_path
         self.audio_split_transformer = audio_split_transformer
@@ -42,20 +72,139 @@ class Step2_SplitAudio:
         self.sections = sections
         self.audio_loudness_transformer = audio_loudness_transformer
         self.remap_sort = remap_sort
+        self.number_of_workers = number_of_workers
+        self.max_chapters_in_flight = max_chapters_in_flight or 2 * number_of_workers
+        self.write_queue_size = write_queue_size
+        self.audio_statistic_component = audio_statistic_component
+        self.audio_feature_persistence = audio_feature_persistence
+        self.write_features = write_features
 
     def run(self):
-        return DoneMarker(self.save_path).run(self.script)
+        # the clips only depend on the chapters and the settings, not on how they are processed
+        self.step_cache = StepCache(self.save_path, self, inputs=[self.audio_persistence.load_path], ignored_attributes=['number_of_workers', 'max_chapters_in_flight', 'write_queue_size'])
+        return self.step_cache.run(self.script)
     
     def script(self):
-        audios = self.audio_persistence.load_all()
+        ids = self.audio_persistence.get_ids()
         if self.remap_sort:
-            audios = list(audios)
-            audios = [audios[i] for i in self.remap_sort]
-        sections = [i+1 for i in range(len(self.audio_persistence.get_ids()))] if self.solo_reading else self.sections
-        Parallel(n_jobs=1, verbose=10, batch_size="auto")(delayed(self.split_one_audio)(audio, section) for audio, section in zip(audios, sections))
-
-    def split_one_audio(self, audio: Audio, chapter: int):
-        splitted_audios = self.audio_split_transformer.transform(audio, self.book_name, chapter)
-        for split_audio in splitted_audios:
-            loudness_audio = self.audio_loudness_transformer.transform(split_audio)
-            self.audio_persistence.save(loudness_audio)
+            ids = [ids[i] for i in self.remap_sort]
+        sections = [i+1 for i in range(len(ids))] if self.solo_reading else self.sections
+
+        # chapters of an interrupted run whose clips were all written are skipped
+        done_chapters = self.step_cache.items.load()
+        features = {}
+        for record in done_chapters.values():
+            features.update(record['features'])
+        chapters = [(audio_id, section) for audio_id, section in zip(ids, sections) if audio_id not in done_chapters]
+
+        stage_seconds = {stage: 0.0 for stage in pipeline_stages}
+        self.audio_seconds = 0.0
+        self.clip_count = 0
+        write_queue = Queue(maxsize=self.write_queue_size)
+        writer = Thread(target=self.write_clips, args=(write_queue, stage_seconds), daemon=True)
+        self.writer_error = None
+        writer.start()
+        start_time = time.perf_counter()
+        try:
+            for audio_id, clips, chapter_features, chapter_seconds in self.split_chapters(chapters):
+                features.update(chapter_features)
+                for stage, seconds in chapter_seconds.items():
+                    stage_seconds[stage] += seconds
+                for clip in clips:
+                    self.raise_writer_error()
+                    write_queue.put(clip)
+                # recorded by the writer once the clips before it are written
+                write_queue.put({'id': audio_id, 'features': chapter_features})
+        finally:
+            write_queue.put(None)
+            writer.join()
+        self.raise_writer_error()
+        if self.write_features:
+            self.audio_feature_persistence.save(self.audio_persistence.save_path, features)
+        self.print_stage_report(stage_seconds, time.perf_counter() - start_time)
+
+    def split_chapters(self, chapters: List[Tuple[str, int]]):
+        """Yields the ID, the clips, the features and the stage timings of every chapter. With several workers, at most `max_chapters_in_flight` chapters
+        are submitted at the same time and the chapters are yielded in order of completion."""
+        if self.number_of_workers <= 1:
+            for audio_id, chapter in chapters:
+                yield self.split_chapter(audio_id, chapter)
+            return
+
+        print(f"Splitting {len(chapters)} chapters with {self.number_of_workers} workers.")
+        # spawned instead of forked, because the step may run in a thread of the workflow scheduler next to other threads holding locks
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.number_of_workers, mp_context=context, initializer=init_split_worker, initargs=(self,)) as executor:
+            pending = set()
+            next_chapter = 0
+            while next_chapter < len(chapters) or len(pending) > 0:
+                while next_chapter < len(chapters) and len(pending) < self.max_chapters_in_flight:
+                    pending.add(executor.submit(split_chapter_in_worker, *chapters[next_chapter]))
+                    next_chapter += 1
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+    def split_chapter(self, audio_id: str, chapter: int):
+        """Decodes one chapter and splits it into faded and loudness-normalized clips.
+        Returns the chapter ID, the clips, their statistic features by ID and the seconds spent in each stage."""
+        stage_seconds: Dict[str, float] = {}
+        stage_start = time.perf_counter()
+        audio = self.audio_persistence.load(audio_id)
+        stage_seconds['decode'], stage_start = self.elapsed(stage_start)
+        clips = self.audio_split_transformer.split_into_clips(audio, self.book_name, chapter)
+        stage_seconds['split'], stage_start = self.elapsed(stage_start)
+        clips = self.audio_split_transformer.fade(clips)
+        stage_seconds['fade'], stage_start = self.elapsed(stage_start)
+        clips = [self.audio_loudness_transformer.transform(clip) for clip in clips]
+        stage_seconds['loudness'], stage_start = self.elapsed(stage_start)
+        features = {}
+        if self.write_features:
+            for clip in clips:
+                features[clip.id] = self.audio_statistic_component.get_features(clip)
+                # the cached frames are not needed any more and would otherwise be sent to the writer
+                clip.invalidate_features()
+        stage_seconds['features'], stage_start = self.elapsed(stage_start)
+        return audio_id, clips, features, stage_seconds
+
+    def elapsed(self, stage_start: float):
+        now = time.perf_counter()
+        return now - stage_start, now
+
+    def write_clips(self, write_queue: Queue, stage_seconds: Dict[str, float]):
+        """Background writer: saves the clips of the queue until it receives None, and records a chapter as done when it receives its record.
+        After an error, the remaining items are only taken from the queue."""
+        while True:
+            clip = write_queue.get()
+            if clip is None:
+                return
+            if self.writer_error is not None:
+                continue
+            if isinstance(clip, dict):
+                try:
+                    self.step_cache.items.append(clip)
+                except Exception as e:
+                    self.writer_error = e
+                continue
+            stage_start = time.perf_counter()
+            try:
+                self.audio_persistence.save(clip)
+            except Exception as e:
+                self.writer_error = e
+                continue
+            stage_seconds['write'] += time.perf_counter() - stage_start
+            self.audio_seconds += clip.duration
+            self.clip_count += 1
+
+    def raise_writer_error(self):
+        if self.writer_error is not None:
+            raise self.writer_error
+
+    def print_stage_report(self, stage_seconds: Dict[str, float], wall_seconds: float):
+        """Prints the time of every stage and its throughput in seconds of audio per second. With several workers, the stages overlap,
+        so their times add up to more than the wall time."""
+        print(f"Split {self.audio_seconds:.0f} s of audio into {self.clip_count} clips in {wall_seconds:.1f} s.")
+        for stage in pipeline_stages:
+            seconds = stage_seconds[stage]
+            throughput = self.audio_seconds / seconds if seconds > 0 else float('inf')
+            print(f"  {stage:<10} {seconds:8.1f} s  {throughput:8.1f}x realtime")
@@ -7,54 +7,115 @@ from pandas.core.frame import DataFrame
 from huiAudioCorpus.model.Transcripts import Transcripts
 from huiAudioCorpus.persistence.AudioPersistence import AudioPersistence
 from huiAudioCorpus.converter.AudioToSentenceConverter import AudioToSentenceConverter
-from huiAudioCorpus.utils.DoneMarker import DoneMarker
+from huiAudioCorpus.utils.StepCache import StepCache
 from tqdm import tqdm
-import numpy as np
-from joblib import Parallel, delayed
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import torch
+import os
+
+transcription_worker_state = {}
+
+def init_transcription_worker(audio_to_sentence_converter: AudioToSentenceConverter, audio_persistence: AudioPersistence, threads_per_worker: int):
+    """Pin the torch thread count and load the Whisper model once per worker process."""
+    torch.set_num_threads(threads_per_worker)
+    audio_to_sentence_converter.load_model()
+    transcription_worker_state['audio_to_sentence_converter'] = audio_to_sentence_converter
+    transcription_worker_state['audio_persistence'] = audio_persistence
+
+def transcribe_in_worker(ids: List[str], batch_size: int):
+    """Transcribe the audios of the given IDs in a worker process.
+    Returns pairs of ID and recognized sentence, and the ASR cache hits and misses of this chunk."""
+    converter = transcription_worker_state['audio_to_sentence_converter']
+    cache = converter.asr_cache_persistence
+    hits, misses = cache.hits, cache.misses
+    audios = [transcription_worker_state['audio_persistence'].load(id) for id in ids]
+    if batch_size > 1:
+        sentences = converter.convert_batch(audios)
+    else:
+        sentences = [converter.convert(audio) for audio in audios]
+    return [(sentence.id, sentence.sentence) for sentence in sentences], cache.hits - hits, cache.misses - misses
 
 class Step4_TranscriptAudio:
 
-    def __init__(self, save_path: str, audio_to_sentence_converter: AudioToSentenceConverter, audio_persistence: AudioPersistence, transcripts_persistence: TranscriptsPersistence, number_worker=4):
+    def __init__(self, save_path: str, audio_to_sentence_converter: AudioToSentenceConverter, audio_persistence: AudioPersistence, transcripts_persistence: TranscriptsPersistence, number_worker: int = 1, batch_size: int = 1, threads_per_worker: int = None):
         self.save_path = save_path
+        self.batch_size = batch_size
         self.audio_to_sentence_converter = audio_to_sentence_converter
         self.audio_persistence = audio_persistence
         self.transcripts_persistence = transcripts_persistence
         self.number_worker = number_worker
+        # by default the cores are shared evenly, so the Whisper instances do not oversubscribe the CPU
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // number_worker)
 
     def run(self):
-        return DoneMarker(self.save_path).run(self.script)
+        # every transcript is recorded in the items of the step cache as soon as it is available, so an interrupted run can be resumed
+        self.step_cache = StepCache(self.save_path, self, inputs=[self.audio_persistence.load_path], ignored_attributes=['number_worker', 'threads_per_worker', 'batch_size'])
+        return self.step_cache.run(self.script)
     
     def script(self):
         ids = self.audio_persistence.get_ids()
-        # TODO: Parallel crashes here
-        # chunks = np.array_split(ids, self.number_worker)
-        # print(f"Starting parallel ASR with {self.number_worker} jobs.")
-        # parallel_result = Parallel(n_jobs=self.number_worker)(delayed(self.load_one_chunk)(audio_ids, chunk_id) for chunk_id, audio_ids in enumerate(chunks))
-
-        # results = [[sentence.id, sentence.sentence] for level in parallel_result for sentence in level]
-        results = self.load_ids(ids)
-        results = [[sentence.id, sentence.sentence] for sentence in results]
+        transcribed = self.step_cache.items.load()
+        remaining_ids = [id for id in ids if id not in transcribed]
+        if len(transcribed) > 0:
+            print(f"Resuming ASR: {len(ids) - len(remaining_ids)} of {len(ids)} clips are already transcribed.")
+        for id, asr_sentence in self.transcribe(remaining_ids):
+            transcribed[id] = {'id': id, 'asr_sentence': asr_sentence}
+            self.step_cache.items.append(transcribed[id])
+        results = [[id, transcribed[id]['asr_sentence']] for id in ids]
 
         df = DataFrame(results)
         df.columns = ['id', 'asr_sentence']
         transcripts = Transcripts(df, 'transcripts', 'transcripts')
         self.transcripts_persistence.save(transcripts)
 
-    def load_one_chunk(self, ids: List[str], chunk_id: int):
-        print("loading one chunk")
-        sentences = []
-        for id in tqdm(ids, desc="Chunk " + str(chunk_id) + ": "):
-            audio = self.audio_persistence.load(id)
-            sentence = self.audio_to_sentence_converter.convert(audio)
-            sentences.append(sentence)
-            print(f"Transcript for id {id}: {sentence.sentence}")
-        return sentences
+        asr_cache_persistence = self.audio_to_sentence_converter.asr_cache_persistence
+        if asr_cache_persistence.is_enabled():
+            print(asr_cache_persistence.get_summary())
+
+    def transcribe(self, ids: List[str]):
+        """Yields pairs of ID and recognized sentence. With more than one worker, the pairs arrive in order of completion."""
+        if self.number_worker > 1:
+            yield from self.iterate_ids_in_workers(ids)
+            return
+        for sentence in self.iterate_ids(ids):
+            yield sentence.id, sentence.sentence
+
+    def iterate_ids_in_workers(self, ids: List[str]):
+        """Transcribes the given IDs in a pool of `number_worker` processes. Every worker loads its own Whisper model once and
+        uses `threads_per_worker` torch threads; the workers take chunks of `batch_size` IDs from the task queue of the pool."""
+        print(f"Starting parallel ASR with {self.number_worker} workers and {self.threads_per_worker} threads per worker.")
+        chunk_size = max(1, self.batch_size)
+        # spawned workers do not inherit the torch and CUDA state of the parent process
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.number_worker, mp_context=context, initializer=init_transcription_worker,
+                                 initargs=(self.audio_to_sentence_converter, self.audio_persistence, self.threads_per_worker)) as executor:
+            futures = [executor.submit(transcribe_in_worker, ids[chunk_start:chunk_start + chunk_size], self.batch_size) for chunk_start in range(0, len(ids), chunk_size)]
+            # the workers count the cache hits and misses in their own copy of the cache
+            asr_cache_persistence = self.audio_to_sentence_converter.asr_cache_persistence
+            with tqdm(total=len(ids)) as pbar:
+                for future in as_completed(futures):
+                    results, hits, misses = future.result()
+                    asr_cache_persistence.hits += hits
+                    asr_cache_persistence.misses += misses
+                    yield from results
+                    pbar.update(len(results))
 
     def load_ids(self, ids: List[str]):
         """Based on given IDs, loads the corresponding audios and transcribes them via ASR, then returns the recognized sentences."""
-        sentences = []
+        return list(self.iterate_ids(ids))
+
+    def iterate_ids(self, ids: List[str]):
+        """Based on given IDs, loads the corresponding audios and transcribes them via ASR, and yields each recognized sentence as soon as it is available.
+        With a `batch_size` above 1, the audios are transcribed in batches."""
+        if self.batch_size > 1:
+            with tqdm(total=len(ids)) as pbar:
+                for batch_start in range(0, len(ids), self.batch_size):
+                    audios = [self.audio_persistence.load(id) for id in ids[batch_start:batch_start + self.batch_size]]
+                    yield from self.audio_to_sentence_converter.convert_batch(audios)
+                    pbar.update(len(audios))
+            return
         for id in tqdm(ids):
             audio = self.audio_persistence.load(id)
             sentence = self.audio_to_sentence_converter.convert(audio)
-            sentences.append(sentence)
-        return sentences
+            yield sentence
@@ -24,8 +24,11 @@ from huiAudioCorpus.utils.DoneMarker import DoneMarker
 
 class Step5_AlignText:
 
-    def __init__(self, save_path: str, align_sentences_into_text_calculator: AlignSentencesIntoTextCalculator, transcripts_persistence: TranscriptsPersistence, text_to_align_path: str):
+    def __init__(self, save_path: str, align_sentences_into_text_calculator: AlignSentencesIntoTextCalculator, transcripts_persistence: TranscriptsPersistence, text_to_align_path: str,
+                 align_by_chapter: bool = False, number_of_chapter_workers: int = None):
         self.save_path = save_path
+        self.align_by_chapter = align_by_chapter
+        self.number_of_chapter_workers = number_of_chapter_workers
         self.align_sentences_into_text_calculator = align_sentences_into_text_calculator
         self.transcripts_persistence = transcripts_persistence
         self.text_to_align_path = text_to_align_path
@@ -45,7 +48,13 @@ class Step5_AlignText:
             input_text = f.read()
         input_sentence = Sentence(input_text)
 
-        alignments = self.align_sentences_into_text_calculator.calculate(input_sentence, sentences)
+        try:
+            if self.align_by_chapter:
+                alignments = self.align_sentences_into_text_calculator.calculate_by_chapter(input_sentence, sentences, self.number_of_chapter_workers)
+            else:
+                alignments = self.align_sentences_into_text_calculator.calculate(input_sentence, sentences)
+        finally:
+            self.align_sentences_into_text_calculator.close_worker_pool()
 
         # print alignments that are kept despite not being perfect
         not_perfect_alignments = [align for align in alignments if not align.is_perfect and not align.is_above_threshold]
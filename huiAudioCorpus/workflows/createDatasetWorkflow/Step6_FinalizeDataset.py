@@ -18,48 +18,105 @@ limitations under the License.
 from huiAudioCorpus.transformer.TranscriptsSelectionTransformer import TranscriptsSelectionTransformer
 import pandas as pd
 from huiAudioCorpus.model.Audio import Audio
-from huiAudioCorpus.utils.DoneMarker import DoneMarker
+from huiAudioCorpus.utils.StepCache import StepCache
 from huiAudioCorpus.persistence.AudioPersistence import AudioPersistence
+from huiAudioCorpus.persistence.AudioFeaturePersistence import AudioFeaturePersistence
+from huiAudioCorpus.persistence.ShardedAudioPersistence import ShardedAudioPersistence
+import os
+from typing import List
 from huiAudioCorpus.persistence.TranscriptsPersistence import TranscriptsPersistence
 from tqdm import tqdm
 
 class Step6_FinalizeDataset:
 
-    def __init__(self, save_path: str, chapter_path: str, audio_persistence: AudioPersistence, transcripts_persistence: TranscriptsPersistence, transcripts_selection_transformer: TranscriptsSelectionTransformer):
+    def __init__(self, save_path: str, chapter_path: str, audio_persistence: AudioPersistence, transcripts_persistence: TranscriptsPersistence, transcripts_selection_transformer: TranscriptsSelectionTransformer, audio_feature_persistence: AudioFeaturePersistence, write_shards: bool = False):
+        """
+        Params:
+            write_shards: additionally store the clips of every book in shard files (see `ShardedAudioPersistence`) next to the wavs folder
+        """
         self.save_path = save_path
         self.audio_persistence = audio_persistence
         self.transcripts_persistence = transcripts_persistence
         self.chapter_path = chapter_path
         self.transcripts_selection_transformer = transcripts_selection_transformer
+        self.audio_feature_persistence = audio_feature_persistence
+        self.write_shards = write_shards
     
     def run(self):
-        done_marker = DoneMarker(self.save_path)
-        result = done_marker.run(self.script, delete_folder=False)
+        self.step_cache = StepCache(self.save_path, self, inputs=[self.audio_persistence.load_path, self.transcripts_persistence.load_path, self.chapter_path],
+                                    ignored_attributes=['number_of_transfer_workers'])
+        result = self.step_cache.run(self.script, delete_folder=False)
         return result
 
     def script(self):
         transcripts_iterator = list(self.transcripts_persistence.load_all())
         transcripts = transcripts_iterator[0]
-        transcripts_ids = [sentence.id for sentence in transcripts.sentences()]
+        transcripts_ids = set(sentence.id for sentence in transcripts.sentences())
         chapters = pd.read_csv(self.chapter_path)
 
         transcripts_selected_ids = {}
 
         ids = self.audio_persistence.get_ids()
-        audios = self.audio_persistence.load_all()
-        for audio in tqdm(audios, total=len(ids)):
-            book, chapter, index = audio.id.rsplit('_', 2)
+        selected_ids = []
+        target_ids = []
+        for audio_id in ids:
+            book, chapter, index = audio_id.rsplit('_', 2)
             reader = str(chapters.loc[int(chapter) - 1]['Reader']).replace(' ', '_')  # type:ignore
-            if audio.id in transcripts_ids:
+            if audio_id in transcripts_ids:
                 path = reader + '/' + book
                 if path in transcripts_selected_ids:
-                    transcripts_selected_ids[path].append(audio.id)
+                    transcripts_selected_ids[path].append(audio_id)
                 else:
-                    transcripts_selected_ids[path] = [audio.id]
-                audio.id = path + '/wavs/' + audio.id
-                self.audio_persistence.save(audio)
+                    transcripts_selected_ids[path] = [audio_id]
+                selected_ids.append(audio_id)
+                target_ids.append(path + '/wavs/' + audio_id)
+
+        # the clips keep their format, so the files are transferred without decoding; clips of an interrupted run are not transferred again
+        transferred_ids = self.step_cache.items.load()
+        remaining = [(audio_id, target_id) for audio_id, target_id in zip(selected_ids, target_ids) if audio_id not in transferred_ids]
+        if len(remaining) > 0:
+            self.transfer_audios([audio_id for audio_id, _ in remaining], [target_id for _, target_id in remaining])
+
+        if self.write_shards:
+            for path, path_ids in transcripts_selected_ids.items():
+                sharded_audio_persistence = self.create_sharded_audio_persistence(path)
+                for audio_id in tqdm(path_ids):
+                    sharded_audio_persistence.save(self.audio_persistence.load(audio_id))
+                sharded_audio_persistence.close()
 
         for path, ids in transcripts_selected_ids.items():
             local_transcripts = self.transcripts_selection_transformer.transform(transcripts, ids)
             local_transcripts.id = path + '/metadata'
-            self.transcripts_persistence.save(local_transcripts)
\ No newline at end of file
+            self.transcripts_persistence.save(local_transcripts)
+
+        self.copy_features(transcripts_selected_ids)
+
+    def transfer_audios(self, audio_ids: List[str], target_ids: List[str], records_per_write: int = 1000):
+        """Transfers the audios and records the finished ones in the step cache, in batches to keep the number of disk syncs low."""
+        finished = []
+        def record(audio_id: str):
+            finished.append({'id': audio_id})
+            if len(finished) >= records_per_write:
+                self.step_cache.items.append_all(finished)
+                finished.clear()
+        try:
+            self.audio_persistence.transfer(audio_ids, target_ids, on_transferred=record)
+        finally:
+            # the audios finished before an error are resumed as well
+            self.step_cache.items.append_all(finished)
+
+    def create_sharded_audio_persistence(self, path: str):
+        """Returns a sharded persistence for the book folder, after removing the shards of an earlier interrupted run."""
+        sharded_audio_persistence = ShardedAudioPersistence(self.audio_persistence.save_path + '/' + path)
+        for shard_path in sharded_audio_persistence.get_shard_paths():
+            os.unlink(shard_path)
+        return sharded_audio_persistence
+
+    def copy_features(self, transcripts_selected_ids: dict):
+        """Writes the features of the selected clips from the sidecar of Step2 into a sidecar per book folder, with the IDs relative to that folder."""
+        features = self.audio_feature_persistence.load(self.audio_persistence.load_path)
+        if len(features) == 0:
+            return
+        for path, ids in transcripts_selected_ids.items():
+            book_features = {'wavs/' + audio_id: features[audio_id] for audio_id in ids if audio_id in features}
+            self.audio_feature_persistence.save(self.audio_persistence.save_path + '/' + path, book_features)
\ No newline at end of file
@@ -61,10 +61,11 @@ class Step9_GenerateCleanDataset:
         self.copy_and_filter_transcripts(audios_allowed)
 
     def copy_audio_files(self, audios_allowed):
-        count_files = len(self.audio_persistence.get_ids())
-        for audio in tqdm(self.audio_persistence.load_all(), total=count_files):
-            if audio.name in audios_allowed:
-                self.audio_persistence.save(audio)
+        """Copies the allowed audios. They are only decoded if they have to be resampled, otherwise the files are transferred as they are."""
+        audios_allowed = set(audios_allowed)
+        ids = [audio_id for audio_id in self.audio_persistence.get_ids() if self.audio_persistence.path_util.filename_without_extension(audio_id) in audios_allowed]
+        transform = None if self.audio_sampling_rate_transformer.target_sampling_rate is None else self.audio_sampling_rate_transformer.transform
+        self.audio_persistence.transfer(ids, transform=transform)
 
     def copy_and_filter_transcripts(self, used_audio_file_names):
         for transcripts in tqdm(self.transcripts_persistence.load_all()):
@@ -0,0 +1,68 @@
+"""
+Copyright 2024 Lyonel Behringer
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from huiAudioCorpus.model.Audio import Audio
+from huiAudioCorpus.persistence.AudioPersistence import AudioPersistence
+import librosa
+import random
+import time
+import argparse
+
+
+def legacy_silence_db(audio: Audio):
+    """The previous implementation of `Audio.silence_db`, which splits the audio once per threshold."""
+    silence_duration_in_seconds = 0.05
+    frame_length = int(silence_duration_in_seconds * audio.sampling_rate)
+    for silence_decibel in range(100, 1, -1):
+        splitted = librosa.effects.split(y=audio.time_series, top_db=silence_decibel, frame_length=frame_length, hop_length=int(frame_length / 4))
+        if len(splitted) > 1:
+            return -silence_decibel
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares the per-clip runtime and the results of the legacy and the current silence_db computation.")
+    parser.add_argument("-p", "--path", type=str, required=True, help="Folder with wav files, e.g. the final_dataset folder.")
+    parser.add_argument("-n", "--number_of_clips", type=int, default=200, help="Number of randomly chosen clips to measure.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for choosing the clips.")
+    args = parser.parse_args()
+
+    audio_persistence = AudioPersistence(args.path)
+    ids = audio_persistence.get_ids()
+    random.Random(args.seed).shuffle(ids)
+    ids = ids[:args.number_of_clips]
+
+    legacy_seconds = 0.0
+    current_seconds = 0.0
+    mismatches = []
+    for audio_id in ids:
+        audio = audio_persistence.load(audio_id)
+        start = time.perf_counter()
+        legacy_result = legacy_silence_db(audio)
+        legacy_seconds += time.perf_counter() - start
+        start = time.perf_counter()
+        current_result = audio.compute_silence_db()
+        current_seconds += time.perf_counter() - start
+        if legacy_result != current_result:
+            mismatches.append((audio_id, legacy_result, current_result))
+
+    print(f"Clips: {len(ids)}")
+    print(f"Legacy:  {legacy_seconds / len(ids) * 1000:8.2f} ms per clip")
+    print(f"Current: {current_seconds / len(ids) * 1000:8.2f} ms per clip")
+    print(f"Speedup: {legacy_seconds / current_seconds:8.1f}x")
+    print(f"Mismatches: {len(mismatches)}")
+    for audio_id, legacy_result, current_result in mismatches:
+        print(f"  {audio_id}: legacy {legacy_result}, current {current_result}")
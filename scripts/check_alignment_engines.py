@@ -0,0 +1,99 @@
+"""
+Copyright 2024 Lyonel Behringer
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from huiAudioCorpus.calculator.AlignSentencesIntoTextCalculator import AlignSentencesIntoTextCalculator, alignment_engines
+from huiAudioCorpus.model.Sentence import Sentence
+from huiAudioCorpus.transformer.SentenceDistanceTransformer import SentenceDistanceTransformer
+import argparse
+import random
+
+
+def create_text(number_of_words: int, generator: random.Random):
+    vocabulary = [''.join(generator.choice('abcdefghij') for _ in range(generator.randint(1, 8))) for _ in range(300)]
+    return [generator.choice(vocabulary) for _ in range(number_of_words)]
+
+
+def create_sentence(words: list, generator: random.Random):
+    """Takes the words of the original text with some of them misspelled or missing, like a transcript."""
+    sentence_words = []
+    for word in words:
+        if generator.random() < 0.05:
+            continue
+        if generator.random() < 0.1:
+            word = word[:-1] + generator.choice('xyz')
+        sentence_words.append(word)
+    return Sentence(' '.join(sentence_words or ['x']))
+
+
+def create_searches(words: list, number_of_searches: int, generator: random.Random):
+    """Returns (sentence_to_align, range_start, range_end) searches, half of them with a search range that runs past the end of the text."""
+    searches = []
+    for index in range(number_of_searches):
+        at_end = index % 2 == 1
+        number_of_sentence_words = generator.randint(1, 25)
+        if at_end:
+            start = generator.randint(max(0, len(words) - 60), len(words) - 1)
+        else:
+            start = generator.randint(0, len(words) - number_of_sentence_words)
+        range_start = max(0, start - generator.randint(0, 60))
+        if at_end:
+            range_end = len(words) + generator.randint(2, 80)
+        else:
+            range_end = min(start + number_of_sentence_words + generator.randint(2, 60), len(words) + 1)
+        searches.append((create_sentence(words[start:start + number_of_sentence_words], generator), range_start, range_end))
+    return searches
+
+
+def check(name: str, condition: bool):
+    print(f"{'ok    ' if condition else 'FAILED'} {name}")
+    return condition
+
+
+def run_checks(engines: list, number_of_words: int, number_of_searches: int, seed: int):
+    generator = random.Random(seed)
+    words = create_text(number_of_words, generator)
+    original_text = Sentence(' '.join(words))
+    searches = create_searches(words, number_of_searches, generator)
+    # a search range that starts inside the last sentence and ends far after the text
+    searches.append((Sentence(' '.join(words[-9:-2])), len(words) - 11, len(words) + 39))
+
+    calculators = {engine: AlignSentencesIntoTextCalculator(SentenceDistanceTransformer(), [1], alignment_engine=engine) for engine in ['exhaustive'] + engines}
+    results = []
+    for engine in engines:
+        differences = []
+        for sentence_to_align, range_start, range_end in searches:
+            expected = calculators['exhaustive'].best_position_in_process(original_text, sentence_to_align, range_start, range_end)
+            try:
+                position = calculators[engine].best_position_in_process(original_text, sentence_to_align, range_start, range_end)
+            except IndexError as e:
+                position = repr(e)
+            if position != expected:
+                differences.append((range_start, range_end, expected, position))
+        for range_start, range_end, expected, position in differences[:5]:
+            print(f'  {engine} in {range_start}:{range_end} of {original_text.words_count} words: {position} instead of {expected}')
+        results.append(check(f'{engine} finds the same positions as exhaustive, also for search ranges past the end of the text', len(differences) == 0))
+    return all(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Checks that the alignment engines find the same positions as the exhaustive engine.")
+    parser.add_argument("-e", "--engines", nargs='+', choices=alignment_engines, default=['banded', 'bounded'], help="Engines which are compared to the exhaustive engine.")
+    parser.add_argument("-w", "--number_of_words", type=int, default=401, help="Number of words of the original text.")
+    parser.add_argument("-n", "--number_of_searches", type=int, default=80, help="Number of searches.")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="Seed of the random text and searches.")
+    args = parser.parse_args()
+    if not run_checks(args.engines, args.number_of_words, args.number_of_searches, args.seed):
+        raise SystemExit(1)
@@ -0,0 +1,180 @@
+"""
+Copyright 2024 Lyonel Behringer
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from huiAudioCorpus.utils.DownloadManager import DownloadManager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import os
+import re
+import requests
+import shutil
+import tempfile
+import threading
+import time
+
+
+class StandInServer:
+    """Local stand-in for the LibriVox download server. Serves random files with HTTP range support and can drop the connection
+    in the middle of a file, ignore range requests, or answer with 404."""
+
+    def __init__(self, number_of_files: int, file_size: int):
+        self.files = {f'/chapter_{index}.mp3': os.urandom(file_size + index * 1000) for index in range(number_of_files)}
+        self.drop_paths = set()
+        self.ignore_ranges = False
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.create_handler())
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def create_handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with stand_in.lock:
+                    stand_in.requests.append((self.path, self.headers.get('Range')))
+                    stand_in.active += 1
+                    stand_in.max_active = max(stand_in.max_active, stand_in.active)
+                try:
+                    self.send_file()
+                finally:
+                    with stand_in.lock:
+                        stand_in.active -= 1
+
+            def send_file(self):
+                if self.path not in stand_in.files:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = stand_in.files[self.path]
+                start = 0
+                range_header = self.headers.get('Range')
+                if range_header is not None and not stand_in.ignore_ranges:
+                    start = int(re.match(r'bytes=(\d+)-', range_header).group(1))  # type: ignore
+                    if start >= len(body):
+                        self.send_response(416)
+                        self.send_header('Content-Range', f'bytes */{len(body)}')
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header('Content-Range', f'bytes {start}-{len(body) - 1}/{len(body)}')
+                else:
+                    self.send_response(200)
+                content = body[start:]
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                if self.path in stand_in.drop_paths:
+                    # send a third of the file and close the connection
+                    stand_in.drop_paths.discard(self.path)
+                    self.wfile.write(content[:len(content) // 3])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    return
+                time.sleep(0.05)
+                self.wfile.write(content)
+
+        return Handler
+
+    def shutdown(self):
+        self.server.shutdown()
+
+
+def check(name: str, condition: bool):
+    print(f"{'ok    ' if condition else 'FAILED'} {name}")
+    return condition
+
+
+def run_checks(number_of_files: int, file_size: int, number_of_connections: int):
+    server = StandInServer(number_of_files, file_size)
+    output_folder = tempfile.mkdtemp()
+    download_manager = DownloadManager(number_of_connections=number_of_connections, chunk_size=8192)
+    paths = sorted(server.files)
+    results = []
+    def is_complete(path: str):
+        with open(output_folder + path, 'rb') as f:
+            return f.read() == server.files[path]
+    try:
+        server.drop_paths = set(paths[1::2])
+        download_manager.download_all([(server.url + path, output_folder + path) for path in paths])
+        results.append(check('dropped connections are resumed', all(is_complete(path) for path in paths)))
+        resumed = [range_header for path, range_header in server.requests if path in paths[1::2] and range_header is not None]
+        results.append(check('resumed with range requests', len(resumed) == len(paths[1::2])))
+        results.append(check(f'at most {number_of_connections} downloads at the same time', server.max_active <= number_of_connections))
+        results.append(check('no part files are left', not any(name.endswith(DownloadManager.part_extension) for name in os.listdir(output_folder))))
+
+        path = paths[0]
+        server.requests.clear()
+        download_manager.download_all([(server.url + path, output_folder + path) for path in paths])
+        results.append(check('existing files are skipped', len(server.requests) == 0))
+
+        os.unlink(output_folder + path)
+        with open(output_folder + path + DownloadManager.part_extension, 'wb') as f:
+            f.write(server.files[path][:1000])
+        server.requests.clear()
+        download_manager.download(server.url + path, output_folder + path)
+        results.append(check('a part file is resumed', is_complete(path) and server.requests == [(path, 'bytes=1000-')]))
+
+        os.unlink(output_folder + path)
+        with open(output_folder + path + DownloadManager.part_extension, 'wb') as f:
+            f.write(b'x' * 5000)
+        server.ignore_ranges = True
+        download_manager.download(server.url + path, output_folder + path)
+        server.ignore_ranges = False
+        results.append(check('a server without range support restarts the file', is_complete(path)))
+
+        os.unlink(output_folder + path)
+        with open(output_folder + path + DownloadManager.part_extension, 'wb') as f:
+            f.write(server.files[path])
+        download_manager.download(server.url + path, output_folder + path)
+        results.append(check('a complete part file is accepted after 416', is_complete(path)))
+
+        os.unlink(output_folder + path)
+        with open(output_folder + path + DownloadManager.part_extension, 'wb') as f:
+            f.write(server.files[path] + b'xx')
+        download_manager.download(server.url + path, output_folder + path)
+        results.append(check('a larger part file is downloaded again', is_complete(path)))
+
+        server.requests.clear()
+        try:
+            download_manager.download(server.url + '/missing.mp3', output_folder + '/missing.mp3')
+            failed = False
+        except requests.HTTPError:
+            failed = True
+        results.append(check('404 is raised without retrying', failed and len(server.requests) == 1))
+    finally:
+        server.shutdown()
+        shutil.rmtree(output_folder)
+    return all(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Checks the resume, range and verification paths of the DownloadManager against a local stand-in server.")
+    parser.add_argument("-n", "--number_of_files", type=int, default=6, help="Number of files served by the stand-in server.")
+    parser.add_argument("-s", "--file_size", type=int, default=300_000, help="Size of the smallest file in bytes.")
+    parser.add_argument("-c", "--number_of_connections", type=int, default=3, help="Number of concurrent downloads.")
+    args = parser.parse_args()
+    if not run_checks(args.number_of_files, args.file_size, args.number_of_connections):
+        raise SystemExit(1)
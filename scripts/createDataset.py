@@ -20,6 +20,8 @@ from huiAudioCorpus.dependencyInjection.DependencyInjection import DependencyInj
 # import datasetWorkflow
 import scripts.createDatasetConfig as createDatasetConfig
 from huiAudioCorpus.utils.PathUtil import PathUtil
+from huiAudioCorpus.utils.WhisperModelRegistry import WhisperModelRegistry
+from huiAudioCorpus.workflows.WorkflowScheduler import WorkflowScheduler
 import os
 
 
@@ -77,6 +79,28 @@ workflow_config = {
     'generate_clean': True
 }
 
+# Whisper model used by step 4, it is loaded once and shared by all books
+asr_config = {
+    'model_name': 'small',
+    'model_path': None,
+    'device': None,
+    'compute_type': None
+}
+# steps of different books and independent steps of a book run at the same time, limited per resource
+# the Whisper model is shared by all books, so only one step 4 may run at a time
+scheduler_config = {
+    'max_workers': 4,
+    'resource_limits': {
+        'network': 2,
+        'cpu': 2,
+        'asr': 1,
+        'disk': 2
+    }
+}
+
+# transcripts of byte-identical clips are reused across runs, set to None to disable
+asr_cache_path = data_base_path + '/asr_cache'
+
 final_dataset_path = data_base_path + '/final_dataset'
 final_dataset_path_clean = data_base_path + '/final_dataset_clean'
 step7_path = data_base_path + '/raw_statistic'
@@ -90,8 +114,18 @@ def clean_filter(input):
     input = input[input['silence_percent'] > 10]
     return input
 
-def run_workflow(params: Dict, workflow_config: Dict):
+def add_step(scheduler: WorkflowScheduler, group: str, step_name: str, config: Dict, dependencies=[], resources=[], main_thread=False, task_name=None):
+    """Adds a step that is created from its own dependency injection. Dependencies on steps that are not part of the workflow are left out."""
+    task_name = task_name or step_name
+    def run():
+        log_step(group + ': ' + task_name)
+        getattr(DependencyInjection(config), step_name).run()
+    dependencies = [group + '/' + dependency for dependency in dependencies if scheduler.has(group + '/' + dependency)]
+    return scheduler.add(group + '/' + task_name, run, dependencies, resources, group, main_thread)
+
+def add_workflow(scheduler: WorkflowScheduler, params: Dict, workflow_config: Dict):
     print(params)
+    title = params['title']
     book_base_path = data_base_path + '/books/'
 
     step1_path = book_base_path + params['title'] + '/Step1_DownloadAudio'
@@ -112,7 +146,6 @@ def run_workflow(params: Dict, workflow_config: Dict):
     step6_path  = book_base_path + params['title'] + '/Step6_FinalizeDataset'
         
     if workflow_config['prepare_audio']:
-        log_step('step1_download_audio')
         config = {
             'audios_from_librivox_persistence': {
                 'reader': params['reader'],
@@ -126,9 +159,8 @@ def run_workflow(params: Dict, workflow_config: Dict):
                 'save_path': step1_path
             }
         }
-        DependencyInjection(config).step1_download_audio.run()
+        add_step(scheduler, title, 'step1_download_audio', config, [], ['network'])
 
-        log_step('step2_split_audio')
         config = {
             'audio_split_transformer': {
                 'min_audio_duration': 5,
@@ -151,9 +183,8 @@ def run_workflow(params: Dict, workflow_config: Dict):
                 'remap_sort': params['remap_sort'] if 'remap_sort' in params else None
             }
         }
-        DependencyInjection(config).step2_split_audio.run()
+        add_step(scheduler, title, 'step2_split_audio', config, ['step1_download_audio'], ['cpu'])
 
-        log_step('step2_1_audio_statistic')
         config = {
             'step2_1_audio_statistic': {
                 'save_path': step2_1_path,
@@ -166,10 +197,9 @@ def run_workflow(params: Dict, workflow_config: Dict):
                 'save_path': step2_1_path
             }
         }
-        DependencyInjection(config).step2_1_audio_statistic.run()
+        add_step(scheduler, title, 'step2_1_audio_statistic', config, ['step2_split_audio'], ['disk'], main_thread=True)
 
     if workflow_config['prepare_text']:
-        log_step('step3_download_text')
         config = {
             'gutenberg_book_persistence': {
                 'text_id': params['gutenberg_id'],
@@ -179,9 +209,8 @@ def run_workflow(params: Dict, workflow_config: Dict):
                 'save_path': step3_path
             }
         }
-        DependencyInjection(config).step3_download_text.run()
+        add_step(scheduler, title, 'step3_download_text', config, [], ['network'])
 
-        log_step('step3_1_prepare_text')
         config = {
             'step3_1_prepare_text': {
                 'save_path': step3_1_path,
@@ -195,10 +224,9 @@ def run_workflow(params: Dict, workflow_config: Dict):
                 'remove': params['remove'] if 'remove' in params else []
             }
         }
-        DependencyInjection(config).step3_1_prepare_text.run()
+        add_step(scheduler, title, 'step3_1_prepare_text', config, ['step3_download_text'], ['cpu'])
 
     if workflow_config['transcript_text']:
-        log_step('step4_transcript_audio')
         config = {
             'step4_transcript_audio': {
                 'save_path': step4_path,
@@ -207,15 +235,18 @@ def run_workflow(params: Dict, workflow_config: Dict):
                 'load_path': step2_path_audio
             },
             'audio_to_sentence_converter': {
-                'language': params['language']
+                'language': params['language'],
+                **asr_config
             },
             'transcripts_persistence': {
                 'load_path': step4_path,
+            },
+            'asr_cache_persistence': {
+                'cache_path': asr_cache_path
             }
         }
-        DependencyInjection(config).step4_transcript_audio.run()
+        add_step(scheduler, title, 'step4_transcript_audio', config, ['step2_split_audio'], ['asr'])
 
-        log_step('step4_1_normalize_transcript')
         config = {
             "step4_1_normalize_transcript": {
                 'save_path': step4_1_path,
@@ -227,10 +258,9 @@ def run_workflow(params: Dict, workflow_config: Dict):
                 "save_path": step4_1_path
             }
         }
-        DependencyInjection(config).step4_1_normalize_transcript.run()
+        add_step(scheduler, title, 'step4_1_normalize_transcript', config, ['step4_transcript_audio'], ['cpu'])
 
     if workflow_config['align_text']:
-        log_step('step5_align_text')
         config = {
             'step5_align_text': {
                 'save_path': step5_path,
@@ -241,13 +271,15 @@ def run_workflow(params: Dict, workflow_config: Dict):
                 'save_path': step5_path
             },
             'align_sentences_into_text_calculator': {
-                'sections': params['sections']
+                'sections': params['sections'],
+                'alignment_engine': 'bounded',
+                # the cpu steps that run at the same time share the cores
+                'number_of_workers': max(1, (os.cpu_count() or 1) // scheduler_config['resource_limits']['cpu'])
             }
         }
-        DependencyInjection(config).step5_align_text.run()
+        add_step(scheduler, title, 'step5_align_text', config, ['step4_1_normalize_transcript', 'step3_1_prepare_text'], ['cpu'])
 
     if workflow_config['finalize']:
-        log_step('step6_finalize_dataset')
         config = {
             'step6_finalize_dataset': {
                 'save_path': step6_path,
@@ -262,42 +294,39 @@ def run_workflow(params: Dict, workflow_config: Dict):
                 'save_path': final_dataset_path
             }
         }
-        DependencyInjection(config).step6_finalize_dataset.run()
+        add_step(scheduler, title, 'step6_finalize_dataset', config, ['step5_align_text', 'step2_split_audio'], ['disk'])
 
 if __name__ == "__main__":
+    if workflow_config['transcript_text']:
+        WhisperModelRegistry.warm_up(asr_config['model_path'] or asr_config['model_name'], asr_config['device'], asr_config['compute_type'])
+    book_scheduler = WorkflowScheduler(scheduler_config['resource_limits'], scheduler_config['max_workers'], workflow_config['continue_on_error'])
+    for config_name in all_configs:
+        add_workflow(book_scheduler, all_configs[config_name], workflow_config)
+    try:
+        statuses = book_scheduler.run()
+    finally:
+        book_scheduler.print_critical_path_report()
     summary = {}
     for config_name in all_configs:
-        print('+++++++++++++++++++++++++++++++++++++++++')
-        print('+++++++++++++++++++++++++++++++++++++++++')
-        print('+++++++++++++++++++++++++++++++++++++++++')
-        log_step(config_name)
-        print('+++++++++++++++++++++++++++++++++++++++++')
-        print('+++++++++++++++++++++++++++++++++++++++++')
-        print('+++++++++++++++++++++++++++++++++++++++++')
-
-        config = all_configs[config_name]
-        if workflow_config['continue_on_error']:
-            try:
-                run_workflow(config, workflow_config)
-                summary[config['title']] = 'finished'
-            except Exception:
-                summary[config['title']] = 'error'
-        else:
-            run_workflow(config, workflow_config)
+        title = all_configs[config_name]['title']
+        book_statuses = [status for name, status in statuses.items() if name.startswith(title + '/')]
+        summary[title] = 'finished' if all(status == 'finished' for status in book_statuses) else 'error'
     print(summary)
+    WhisperModelRegistry.evict()
+
+    # the dataset steps read the final dataset of all books, so they are only started after the books are done
+    dataset_scheduler = WorkflowScheduler(scheduler_config['resource_limits'], scheduler_config['max_workers'], workflow_config['continue_on_error'])
 
     if workflow_config['audio_raw_statistic']:
-        log_step('audio_raw_statistic')
         di_config = {
             'step7_audio_raw_statistic': {
                 'save_path': step7_path,
                 'load_path': final_dataset_path
             }
         }
-        DependencyInjection(di_config).step7_audio_raw_statistic.run()
+        add_step(dataset_scheduler, 'dataset', 'step7_audio_raw_statistic', di_config, [], ['disk'], task_name='audio_raw_statistic')
 
     if workflow_config['full_statistic']:
-        log_step('full_statistic')
         di_config = {
             'step8_dataset_statistic': {
                 'save_path': step8_path,
@@ -315,10 +344,9 @@ if __name__ == "__main__":
                 'show_duration': 0
             }
         }
-        DependencyInjection(di_config).step8_dataset_statistic.run()
+        add_step(dataset_scheduler, 'dataset', 'step8_dataset_statistic', di_config, ['audio_raw_statistic'], [], main_thread=True, task_name='full_statistic')
 
     if workflow_config['clean_statistic']:
-        log_step('clean_statistic')
         di_config = {
             'step8_dataset_statistic': {
                 'save_path': step8_path_clean,
@@ -336,10 +364,9 @@ if __name__ == "__main__":
                 'show_duration': 0
             }
         }
-        DependencyInjection(di_config).step8_dataset_statistic.run()
+        add_step(dataset_scheduler, 'dataset', 'step8_dataset_statistic', di_config, ['audio_raw_statistic'], [], main_thread=True, task_name='clean_statistic')
 
     if workflow_config['generate_clean']:
-        log_step('generate_clean')
         di_config = {
             'step9_generate_clean_dataset': {
                 'save_path': final_dataset_path,
@@ -355,4 +382,9 @@ if __name__ == "__main__":
                 'save_path': final_dataset_path_clean
             },
         }
-        DependencyInjection(di_config).step9_generate_clean_dataset.run()
+        add_step(dataset_scheduler, 'dataset', 'step9_generate_clean_dataset', di_config, ['audio_raw_statistic'], ['disk'], task_name='generate_clean')
+
+    try:
+        dataset_scheduler.run()
+    finally:
+        dataset_scheduler.print_critical_path_report()
@@ -28,6 +28,7 @@ if __name__ == "__main__":
     parser.add_argument("-ts", "--start_timestamp", type=int, default=None, help="Unix timestamp which specifies the catalog date from which to start retrieval.")
     parser.add_argument("--limit_per_iteration", type=int, default=1000, help="Maximum number of results retrieved per iteration.")
     parser.add_argument("-i", "--max_iterations", type=int, default=20, help="Maximum number of iterations that should be performed.")
+    parser.add_argument("--max_concurrent_requests", type=int, default=8, help="Maximum number of requests to LibriVox at the same time.")
     args = parser.parse_args()
 
     if args.database_path:
@@ -41,6 +42,8 @@ if __name__ == "__main__":
 
     timestamp_of_retrieval = time.strftime("%Y%m%d_%H%M%S")
     step0_path = os.path.join(database_path, f"overview_{timestamp_of_retrieval}")
+    # shared by all overviews, so that only books that are new since the last overview are crawled
+    crawl_cache_path = os.path.join(database_path, "librivox_cache")
     config = {
         'audios_from_librivox_persistence': {
             'book_name': '',
@@ -48,7 +51,9 @@ if __name__ == "__main__":
             'chapter_path': '',
             'limit_per_iteration': args.limit_per_iteration,
             'max_iterations': args.max_iterations,
-            'start_timestamp': args.start_timestamp
+            'start_timestamp': args.start_timestamp,
+            'crawl_cache_path': crawl_cache_path,
+            'max_concurrent_requests': args.max_concurrent_requests
         },
         'step0_overview': {
             'save_path': step0_path,